@@ -0,0 +1,69 @@
+#!/bin/bash
+# Noble NovaCoreAI - Distributed Load Test
+# Runs scripts/load_test.py as one Locust master plus N worker processes so
+# load generation scales past a single (GIL-bound) process
+#
+# Usage:
+#   WORKERS=4 TARGET=http://localhost:5000 scripts/load_test_distributed.sh
+#
+# Each worker comfortably drives ~1000 users. Every worker opens one socket per
+# in-flight request, so raise the open-file limit first (ulimit -n 65535).
+
+set -e
+
+# Configuration
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+LOCUSTFILE="$SCRIPT_DIR/load_test.py"
+WORKERS="${WORKERS:-$(nproc)}"
+TARGET="${TARGET:-http://localhost:5000}"
+REPORT_DIR="${REPORT_DIR:-reports}"
+
+# Colors for output
+RED='\033[0;31m'
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+NC='\033[0m' # No Color
+
+log() {
+    echo -e "${GREEN}[$(date +'%Y-%m-%d %H:%M:%S')]${NC} $1"
+}
+
+error() {
+    echo -e "${RED}[$(date +'%Y-%m-%d %H:%M:%S')] ERROR:${NC} $1"
+}
+
+warn() {
+    echo -e "${YELLOW}[$(date +'%Y-%m-%d %H:%M:%S')] WARNING:${NC} $1"
+}
+
+if ! command -v locust > /dev/null; then
+    error "locust not found (pip install locust)"
+    exit 1
+fi
+
+if [ "$(ulimit -n)" != "unlimited" ] && [ "$(ulimit -n)" -lt 65535 ]; then
+    ulimit -n 65535 2>/dev/null || warn "Open-file limit is $(ulimit -n); run 'ulimit -n 65535' for high user counts"
+fi
+
+mkdir -p "$REPORT_DIR"
+
+log "=== Starting distributed load test: $WORKERS workers against $TARGET ==="
+
+# Stop the workers when the master exits or the script is interrupted
+WORKER_PIDS=()
+trap 'kill "${WORKER_PIDS[@]}" 2>/dev/null || true' EXIT
+
+for _ in $(seq 1 "$WORKERS"); do
+    locust -f "$LOCUSTFILE" --worker --master-host=localhost &
+    WORKER_PIDS+=($!)
+done
+
+locust -f "$LOCUSTFILE" \
+    --master \
+    --expect-workers "$WORKERS" \
+    --host "$TARGET" \
+    --headless \
+    --only-summary \
+    --csv="$REPORT_DIR/load"
+
+log "=== Load test complete; stats written to $REPORT_DIR/load_*.csv ==="
@@ -1,22 +1,100 @@
 """Memory distillation logic."""
-import httpx
 import logging
-from typing import List, Dict, Any, Optional
+import re
+from typing import List, Dict, Any, Iterator, Optional
 from datetime import datetime, timedelta
 from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
 import uuid
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Answer to the self-assessment's third question ("How could I improve?"),
+# up to the end of its line
+_A3_ANSWER = re.compile(r"A3:[ \t]*([^\n]*)")
+
+# Distillation thresholds, bound once at import (settings are frozen)
+_EMOTIONAL_WEIGHT_THRESHOLD = settings.emotional_weight_threshold
+_CONFIDENCE_THRESHOLD = settings.confidence_threshold
+_PROMOTION_ACCESS_THRESHOLD = settings.promotion_access_threshold
+
+# Statements are built once at import time and reused across runs so
+# SQLAlchemy's compiled cache keeps a single entry for each of them.
+_FETCH_REFLECTIONS = text("""
+    SELECT
+        t.topic,
+        COUNT(*) AS reflection_count,
+        AVG(NULLIF(m.emotional_weight, 0)) AS avg_emotional_weight,
+        AVG(NULLIF(m.confidence_score, 0)) AS avg_confidence,
+        SUM(CASE WHEN m.outcome = 'success' THEN 1 ELSE 0 END) AS success_count,
+        array_agg(m.id ORDER BY m.created_at DESC) AS source_ids,
+        (array_agg(m.user_id ORDER BY m.created_at DESC))[1] AS user_id
+    FROM memories m
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(
+            (
+                SELECT tag
+                FROM unnest(m.tags) WITH ORDINALITY AS u(tag, position)
+                WHERE tag NOT IN ('reflection', 'self-assessment', 'alignment')
+                ORDER BY position
+                LIMIT 1
+            ),
+            'general'
+        ) AS topic
+    ) t
+    WHERE m.type = 'reflection'
+    AND m.created_at >= :cutoff
+    GROUP BY t.topic
+""")
+
+_FETCH_REFLECTION_OUTPUTS = text("""
+    SELECT id, output_response
+    FROM memories
+    WHERE id = ANY(CAST(:ids AS uuid[]))
+""")
+
+_INSERT_DISTILLED_KNOWLEDGE = text("""
+    INSERT INTO distilled_knowledge (
+        id, user_id, source_reflections, topic, principle,
+        confidence, created_at
+    ) VALUES (
+        :id, :user_id, :source_reflections, :topic, :principle,
+        :confidence, :created_at
+    )
+""")
+
+_PROMOTE_ITM = text("""
+    UPDATE memories
+    SET tier = 'ltm', expires_at = NULL
+    WHERE tier = 'itm'
+    AND access_count >= :threshold
+    AND constitution_valid = true
+    AND (expires_at IS NULL OR expires_at > NOW())
+""")
+
+_CLEANUP_EXPIRED = text("""
+    UPDATE memories
+    SET cleanup_at = NOW(), expires_at = NOW()
+    WHERE expires_at IS NOT NULL
+    AND expires_at < NOW()
+    AND tier != 'ltm'
+    AND cleanup_at IS NULL
+""")
+
 
 class MemoryDistiller:
     """Service for distilling and promoting memories."""
     
-    def __init__(self, db: Session):
-        """Initialize distiller with database session."""
+    def __init__(self, db: Connection):
+        """
+        Initialize distiller with a database connection.
+        
+        The caller owns the surrounding transaction (e.g. engine.begin()),
+        so the distiller never commits on its own.
+        """
         self.db = db
     
     def run_distillation(self) -> Dict[str, Any]:
@@ -24,12 +102,16 @@ class MemoryDistiller:
         Run full memory distillation process.
         
         This process:
-        1. Fetches recent reflections
-        2. Groups by topic/tags
-        3. Calculates aggregate scores
-        4. Creates distilled knowledge entries
-        5. Promotes ITM to LTM based on access count
-        6. Cleans up expired memories
+        1. Streams recent reflections grouped by topic with aggregate
+           scores computed in the database, keeping qualifying topics
+        2. Fetches the source outputs for all qualifying topics in one
+           query and prepares their distilled knowledge entries
+        3. Stores all entries with a single batched INSERT
+        4. Promotes ITM to LTM based on access count
+        5. Cleans up expired memories
+        
+        Steps 3-5 run in a savepoint so a failure discards all of their
+        writes; the caller's transaction commits once at the end.
         
         Returns:
             Summary of distillation process
@@ -46,32 +128,54 @@ class MemoryDistiller:
                 "errors": []
             }
             
-            # Step 1: Fetch recent reflections (last 24 hours)
-            reflections = self.fetch_recent_reflections(hours=24)
-            summary["reflections_processed"] = len(reflections)
-            logger.info(f"Fetched {len(reflections)} recent reflections")
-            
-            # Step 2: Group reflections by topic
-            grouped = self.group_reflections_by_topic(reflections)
-            logger.info(f"Grouped reflections into {len(grouped)} topics")
-            
-            # Step 3: Create distilled knowledge
-            for topic, reflection_group in grouped.items():
+            # Step 1: Stream recent reflections (last 24 hours), grouped by
+            # topic, keeping the topics that meet the distillation criteria
+            qualifying_topics = []
+            topic_count = 0
+            for topic_stats in self.fetch_recent_reflections(hours=24):
+                topic_count += 1
+                summary["reflections_processed"] += topic_stats["reflection_count"]
+                if self.meets_distillation_criteria(topic_stats):
+                    qualifying_topics.append(topic_stats)
+            
+            # Step 2: Fetch outputs of every topic's most recent reflections in
+            # one query, then prepare distilled knowledge entries
+            outputs = self.fetch_reflection_outputs([
+                reflection_id
+                for topic_stats in qualifying_topics
+                for reflection_id in topic_stats["source_ids"][:3]
+            ])
+            
+            knowledge_rows = []
+            for topic_stats in qualifying_topics:
+                topic = topic_stats["topic"]
                 try:
-                    if self.create_distilled_knowledge(topic, reflection_group):
-                        summary["knowledge_distilled"] += 1
-                except Exception as e:
+                    knowledge_rows.append(self.create_distilled_knowledge(topic_stats, outputs))
+                except (KeyError, TypeError, ValueError) as e:
                     logger.error(f"Failed to distill knowledge for topic '{topic}': {e}")
                     summary["errors"].append(f"Distillation error for '{topic}': {str(e)}")
             
-            # Step 4: Promote ITM to LTM
-            promoted = self.promote_itm_to_ltm()
-            summary["memories_promoted"] = promoted
+            logger.info(
+                f"Fetched {summary['reflections_processed']} recent reflections "
+                f"across {topic_count} topics"
+            )
+            
+            # Steps 3-5 share a savepoint; the caller commits once
+            with self.db.begin_nested():
+                # Step 3: Store distilled knowledge in one batched INSERT
+                self.store_distilled_knowledge(knowledge_rows)
+                summary["knowledge_distilled"] = len(knowledge_rows)
+                
+                # Step 4: Promote ITM to LTM
+                promoted = self.promote_itm_to_ltm()
+                summary["memories_promoted"] = promoted
+                
+                # Step 5: Clean up expired memories
+                expired = self.cleanup_expired_memories()
+                summary["memories_expired"] = expired
+            
+            logger.info(f"Stored {len(knowledge_rows)} distilled knowledge entries")
             logger.info(f"Promoted {promoted} memories from ITM to LTM")
-            
-            # Step 5: Clean up expired memories
-            expired = self.cleanup_expired_memories()
-            summary["memories_expired"] = expired
             logger.info(f"Cleaned up {expired} expired memories")
             
             summary["completed_at"] = datetime.utcnow().isoformat()
@@ -80,7 +184,10 @@ class MemoryDistiller:
             logger.info("Memory distillation completed successfully")
             return summary
             
-        except Exception as e:
+        except OperationalError:
+            # Connection-level failures are transient; let the job retry them
+            raise
+        except SQLAlchemyError as e:
             logger.error(f"Memory distillation failed: {e}")
             return {
                 "status": "failed",
@@ -88,200 +195,179 @@ class MemoryDistiller:
                 "started_at": datetime.utcnow().isoformat()
             }
     
-    def fetch_recent_reflections(self, hours: int = 24) -> List[Dict[str, Any]]:
+    def fetch_recent_reflections(self, hours: int = 24) -> Iterator[Dict[str, Any]]:
         """
-        Fetch reflections from the last N hours.
+        Fetch reflections from the last N hours, aggregated per topic.
+        
+        A reflection's topic is its first tag that is not one of the generic
+        reflection tags, or "general" if it has none. Grouping and score
+        aggregation happen in PostgreSQL so only one row per topic is
+        returned instead of every reflection. Rows are read through a
+        server-side cursor and yielded as they arrive, so memory use does
+        not grow with the number of topics.
         
         Args:
             hours: Number of hours to look back
             
-        Returns:
-            List of reflection data
+        Yields:
+            Per-topic aggregates
         """
-        try:
-            cutoff = datetime.utcnow() - timedelta(hours=hours)
-            
-            query = text("""
-                SELECT
-                    id, user_id, session_id, input_context, output_response,
-                    outcome, emotional_weight, confidence_score, tags, created_at
-                FROM memories
-                WHERE type = 'reflection'
-                AND created_at >= :cutoff
-                ORDER BY created_at DESC
-            """)
-            
-            results = self.db.execute(query, {"cutoff": cutoff}).fetchall()
-            
-            reflections = []
-            for row in results:
-                reflections.append({
-                    "id": str(row[0]),
-                    "user_id": str(row[1]),
-                    "session_id": str(row[2]) if row[2] else None,
-                    "input_context": row[3],
-                    "output_response": row[4],
-                    "outcome": row[5],
-                    "emotional_weight": row[6],
-                    "confidence_score": row[7],
-                    "tags": row[8] or [],
-                    "created_at": row[9]
-                })
-            
-            return reflections
-            
-        except Exception as e:
-            logger.error(f"Failed to fetch reflections: {e}")
-            return []
+        cutoff = datetime.utcnow() - timedelta(hours=hours)
+        
+        result = self.db.execute(
+            _FETCH_REFLECTIONS,
+            {"cutoff": cutoff},
+            execution_options={"stream_results": True}
+        )
+        
+        for row in result.yield_per(1000):
+            yield {
+                "topic": row[0],
+                "reflection_count": row[1],
+                "avg_emotional_weight": row[2],
+                "avg_confidence": row[3],
+                "success_count": row[4],
+                "source_ids": [str(source_id) for source_id in row[5]],
+                "user_id": str(row[6]),
+            }
     
-    def group_reflections_by_topic(
-        self,
-        reflections: List[Dict[str, Any]]
-    ) -> Dict[str, List[Dict[str, Any]]]:
+    def fetch_reflection_outputs(self, reflection_ids: List[str]) -> Dict[str, str]:
         """
-        Group reflections by common topics/tags.
+        Fetch the output responses for specific reflections.
         
         Args:
-            reflections: List of reflection data
+            reflection_ids: Reflection IDs, possibly spanning several topics
             
         Returns:
-            Dictionary mapping topics to reflection groups
+            Output responses keyed by reflection ID
         """
-        grouped = {}
+        if not reflection_ids:
+            return {}
         
-        for reflection in reflections:
-            tags = reflection.get("tags", [])
-            
-            # Use first non-reflection tag as topic, or "general" if none
-            topic = "general"
-            for tag in tags:
-                if tag not in ["reflection", "self-assessment", "alignment"]:
-                    topic = tag
-                    break
-            
-            if topic not in grouped:
-                grouped[topic] = []
+        rows = self.db.execute(_FETCH_REFLECTION_OUTPUTS, {"ids": reflection_ids}).fetchall()
+        return {str(row[0]): row[1] or "" for row in rows}
+    
+    def meets_distillation_criteria(self, topic_stats: Dict[str, Any]) -> bool:
+        """
+        Check whether a topic's aggregated reflections qualify for distillation.
+        
+        Args:
+            topic_stats: Per-topic aggregate from fetch_recent_reflections
             
-            grouped[topic].append(reflection)
+        Returns:
+            True if a distilled knowledge entry should be created
+        """
+        topic = topic_stats["topic"]
+        reflection_count = topic_stats["reflection_count"]
+        
+        # Skip if too few reflections
+        if reflection_count < 2:
+            logger.debug(f"Skipping topic '{topic}' - too few reflections")
+            return False
+        
+        avg_emotional_weight = topic_stats["avg_emotional_weight"]
+        avg_confidence = topic_stats["avg_confidence"]
+        
+        if avg_emotional_weight is None or avg_confidence is None:
+            logger.debug(f"Skipping topic '{topic}' - missing scores")
+            return False
+        
+        # Check promotion criteria
+        significant_emotion = abs(avg_emotional_weight) > _EMOTIONAL_WEIGHT_THRESHOLD
+        high_confidence = avg_confidence > _CONFIDENCE_THRESHOLD
+        
+        # Success rate
+        success_rate = topic_stats["success_count"] / reflection_count
+        
+        if not (significant_emotion or high_confidence) or success_rate < 0.5:
+            logger.debug(f"Topic '{topic}' doesn't meet distillation criteria")
+            return False
         
-        return grouped
+        return True
     
     def create_distilled_knowledge(
         self,
-        topic: str,
-        reflections: List[Dict[str, Any]]
-    ) -> bool:
+        topic_stats: Dict[str, Any],
+        outputs: Dict[str, str]
+    ) -> Dict[str, Any]:
         """
-        Create distilled knowledge entry from grouped reflections.
+        Prepare a distilled knowledge entry for a qualifying topic.
+        
+        The entry is not written here; run_distillation stores all prepared
+        entries together via store_distilled_knowledge.
         
         Args:
-            topic: Topic name
-            reflections: Reflections for this topic
+            topic_stats: Per-topic aggregate from fetch_recent_reflections
+            outputs: Reflection outputs keyed by ID, from fetch_reflection_outputs
             
         Returns:
-            True if created successfully, False otherwise
+            Row parameters for the distilled_knowledge INSERT
         """
-        try:
-            # Skip if too few reflections
-            if len(reflections) < 2:
-                logger.debug(f"Skipping topic '{topic}' - too few reflections")
-                return False
-            
-            # Calculate aggregate scores
-            emotional_weights = [r.get("emotional_weight", 0) for r in reflections if r.get("emotional_weight")]
-            confidence_scores = [r.get("confidence_score", 0) for r in reflections if r.get("confidence_score")]
-            
-            if not emotional_weights or not confidence_scores:
-                logger.debug(f"Skipping topic '{topic}' - missing scores")
-                return False
-            
-            avg_emotional_weight = sum(emotional_weights) / len(emotional_weights)
-            avg_confidence = sum(confidence_scores) / len(confidence_scores)
-            
-            # Check promotion criteria
-            significant_emotion = abs(avg_emotional_weight) > settings.emotional_weight_threshold
-            high_confidence = avg_confidence > settings.confidence_threshold
-            
-            # Success rate
-            successes = sum(1 for r in reflections if r.get("outcome") == "success")
-            success_rate = successes / len(reflections)
-            
-            if not (significant_emotion or high_confidence) or success_rate < 0.5:
-                logger.debug(f"Topic '{topic}' doesn't meet distillation criteria")
-                return False
-            
-            # Extract principle from reflections
-            principle = self.extract_principle(topic, reflections)
-            
-            # Get user_id from first reflection
-            user_id = reflections[0].get("user_id")
-            
-            # Create distilled knowledge entry
-            knowledge_id = str(uuid.uuid4())
-            source_ids = [r["id"] for r in reflections]
-            
-            query = text("""
-                INSERT INTO distilled_knowledge (
-                    id, user_id, source_reflections, topic, principle,
-                    confidence, created_at
-                ) VALUES (
-                    :id, :user_id, :source_reflections, :topic, :principle,
-                    :confidence, :created_at
-                )
-            """)
-            
-            self.db.execute(query, {
-                "id": knowledge_id,
-                "user_id": user_id,
-                "source_reflections": source_ids,
-                "topic": topic,
-                "principle": principle,
-                "confidence": avg_confidence,
-                "created_at": datetime.utcnow()
-            })
-            
-            self.db.commit()
-            
-            logger.info(f"Created distilled knowledge for topic '{topic}' from {len(reflections)} reflections")
-            return True
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Failed to create distilled knowledge: {e}")
-            return False
+        topic = topic_stats["topic"]
+        reflection_count = topic_stats["reflection_count"]
+        
+        # Extract principle from the most recent reflections
+        source_ids = topic_stats["source_ids"]
+        topic_outputs = [outputs[reflection_id] for reflection_id in source_ids[:3] if reflection_id in outputs]
+        principle = self.extract_principle(topic, topic_outputs, reflection_count)
+        
+        logger.debug(f"Prepared distilled knowledge for topic '{topic}' from {reflection_count} reflections")
+        return {
+            "id": str(uuid.uuid4()),
+            "user_id": topic_stats["user_id"],
+            "source_reflections": source_ids,
+            "topic": topic,
+            "principle": principle,
+            "confidence": topic_stats["avg_confidence"],
+            "created_at": datetime.utcnow()
+        }
     
+    def store_distilled_knowledge(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Insert prepared distilled knowledge entries in one statement.
+        
+        The caller owns the transaction and is responsible for committing.
+        
+        Args:
+            rows: Row parameters produced by create_distilled_knowledge
+        """
+        if not rows:
+            return
+        
+        self.db.execute(_INSERT_DISTILLED_KNOWLEDGE, rows)
+    
+    @staticmethod
     def extract_principle(
-        self,
         topic: str,
-        reflections: List[Dict[str, Any]]
+        outputs: List[str],
+        reflection_count: int
     ) -> str:
         """
         Extract key principle from reflections.
         
         Args:
             topic: Topic name
-            reflections: Reflections for this topic
+            outputs: Output responses of the top reflections for this topic
+            reflection_count: Total number of reflections for this topic
             
         Returns:
             Extracted principle
         """
-        # Simple extraction: combine key insights
-        insights = []
+        # Simple extraction: combine key insights (dict keeps first-seen order)
+        insights = {}
         
-        for reflection in reflections[:3]:  # Use top 3
-            output = reflection.get("output_response", "")
+        for output in outputs[:3]:  # Use top 3
             # Extract from self-assessment (Q3: How could I improve?)
-            if "A3:" in output:
-                parts = output.split("A3:")
-                if len(parts) > 1:
-                    insight = parts[1].split("\n")[0].strip()
-                    if insight and insight not in insights:
-                        insights.append(insight)
+            match = _A3_ANSWER.search(output)
+            if match:
+                insight = match.group(1).strip()
+                if insight:
+                    insights.setdefault(insight)
         
         if insights:
-            principle = f"For {topic}: " + "; ".join(insights[:2])
+            principle = f"For {topic}: " + "; ".join(list(insights)[:2])
         else:
-            principle = f"General insights about {topic} from {len(reflections)} interactions"
+            principle = f"General insights about {topic} from {reflection_count} interactions"
         
         return principle[:500]  # Limit length
     
@@ -289,55 +375,29 @@ class MemoryDistiller:
         """
         Promote high-access ITM memories to LTM.
         
+        Runs inside the caller's transaction; nothing is committed here.
+        
         Returns:
             Number of memories promoted
         """
-        try:
-            query = text("""
-                UPDATE memories
-                SET tier = 'ltm', expires_at = NULL
-                WHERE tier = 'itm'
-                AND access_count >= :threshold
-                AND constitution_valid = true
-                AND (expires_at IS NULL OR expires_at > NOW())
-            """)
-            
-            result = self.db.execute(query, {
-                "threshold": settings.promotion_access_threshold
-            })
-            
-            self.db.commit()
-            
-            return result.rowcount
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Failed to promote memories: {e}")
-            return 0
+        result = self.db.execute(_PROMOTE_ITM, {
+            "threshold": _PROMOTION_ACCESS_THRESHOLD
+        })
+        
+        return result.rowcount
     
     def cleanup_expired_memories(self) -> int:
         """
         Clean up expired memories (soft deleted).
         
+        Each expired memory is marked once via cleanup_at, so rows handled
+        by an earlier run are not rewritten. Runs inside the caller's
+        transaction; nothing is committed here.
+        
         Returns:
             Number of memories cleaned up
         """
-        try:
-            # Actually just mark as expired if not already
-            query = text("""
-                UPDATE memories
-                SET expires_at = NOW()
-                WHERE expires_at IS NOT NULL
-                AND expires_at < NOW()
-                AND tier != 'ltm'
-            """)
-            
-            result = self.db.execute(query)
-            self.db.commit()
-            
-            return result.rowcount
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Failed to cleanup expired memories: {e}")
-            return 0
+        # Actually just mark as expired if not already
+        result = self.db.execute(_CLEANUP_EXPIRED)
+        
+        return result.rowcount
@@ -1,19 +1,29 @@
 """Scheduler for memory distillation."""
-import schedule
-import time
 import logging
+import time
 from datetime import datetime
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import DisconnectionError, OperationalError
 
 from app.config import settings
 from app.distiller import MemoryDistiller
 
 logger = logging.getLogger(__name__)
 
+# Attempts for a job that hits a transient connection error; waits 1s, 2s, ...
+JOB_MAX_ATTEMPTS = 3
+
 # Create database engine
-engine = create_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = sessionmaker(bind=engine)
+engine = create_engine(
+    settings.database_url,
+    pool_size=2,
+    max_overflow=0,
+    pool_recycle=1200,  # Recycle connections every 20 minutes
+    pool_pre_ping=False,  # Stale connections are handled by the job retry below
+    query_cache_size=1200,  # Keep compiled forms of the module-level statements
+)
 
 
 def run_distillation_job():
@@ -22,18 +32,31 @@ def run_distillation_job():
     logger.info(f"Starting scheduled distillation job at {datetime.utcnow()}")
     logger.info("=" * 60)
     
-    db = SessionLocal()
-    try:
-        distiller = MemoryDistiller(db)
-        result = distiller.run_distillation()
-        
-        logger.info("Distillation job completed")
-        logger.info(f"Summary: {result}")
-        
-    except Exception as e:
-        logger.error(f"Distillation job failed: {e}")
-    finally:
-        db.close()
+    for attempt in range(JOB_MAX_ATTEMPTS):
+        try:
+            # One connection and one transaction for the whole run; commit or
+            # rollback happens once when the block exits
+            with engine.begin() as conn:
+                distiller = MemoryDistiller(conn)
+                result = distiller.run_distillation()
+            
+            logger.info("Distillation job completed")
+            logger.info(f"Summary: {result}")
+            break
+            
+        except (OperationalError, DisconnectionError) as e:
+            if attempt + 1 == JOB_MAX_ATTEMPTS:
+                logger.error(f"Distillation job failed after {JOB_MAX_ATTEMPTS} attempts: {e}")
+                break
+            delay = 2 ** attempt
+            logger.warning(f"Database unavailable ({e}); retrying in {delay}s")
+            # Drop pooled connections that may have gone stale since last night
+            engine.dispose()
+            time.sleep(delay)
+        except Exception as e:
+            # Job boundary: never let one bad run take the scheduler down
+            logger.error(f"Distillation job failed: {e}")
+            break
     
     logger.info("=" * 60)
 
@@ -43,19 +66,27 @@ def start_scheduler():
     logger.info("🧪 Starting Memory Distillation Scheduler")
     logger.info(f"Scheduled to run daily at {settings.schedule_hour}:00 UTC")
     
-    # Schedule job to run daily at specified hour
-    schedule.every().day.at(f"{settings.schedule_hour:02d}:00").do(run_distillation_job)
+    # Sleep until the next fire time instead of polling every minute
+    scheduler = BlockingScheduler(timezone="UTC")
+    scheduler.add_job(
+        run_distillation_job,
+        CronTrigger(hour=settings.schedule_hour, minute=0, timezone="UTC"),
+        id="memory_distillation",
+        coalesce=True,
+        max_instances=1,
+    )
     
-    # Also allow manual trigger via environment variable
-    if settings.database_url:
+    # Optionally run once immediately (RUN_ON_STARTUP)
+    if settings.run_on_startup:
         logger.info("Running initial distillation on startup...")
         run_distillation_job()
     
     logger.info("Scheduler started. Waiting for scheduled time...")
     
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Scheduler stopped")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+"""
+Pytest configuration and fixtures for Distillation Worker tests
+"""
+import json
+import pytest
+import sqlite3
+from datetime import datetime
+from typing import Generator
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection
+
+# SQLite has no array type; store list parameters (source_reflections) as JSON
+sqlite3.register_adapter(list, json.dumps)
+
+# SQLite-compatible subset of the memories/distilled_knowledge schema in
+# shared/schemas/01_init.sql and 13_memory_cleanup_marker.sql
+SCHEMA_SQL = [
+    """
+    CREATE TABLE memories (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        type VARCHAR(50),
+        output_response TEXT,
+        outcome VARCHAR(50),
+        emotional_weight FLOAT,
+        confidence_score FLOAT,
+        constitution_valid BOOLEAN DEFAULT 1,
+        tags TEXT,
+        tier VARCHAR(20),
+        access_count INTEGER DEFAULT 0,
+        created_at TIMESTAMP,
+        expires_at TIMESTAMP,
+        cleanup_at TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE distilled_knowledge (
+        id TEXT PRIMARY KEY,
+        user_id TEXT,
+        source_reflections TEXT,
+        topic VARCHAR(255),
+        principle TEXT,
+        confidence FLOAT,
+        created_at TIMESTAMP
+    )
+    """,
+]
+
+
+@pytest.fixture(scope="function")
+def db_conn() -> Generator[Connection, None, None]:
+    """In-memory SQLite connection with the distillation schema, one per test"""
+    engine = create_engine("sqlite+pysqlite:///:memory:")
+
+    @event.listens_for(engine, "connect")
+    def _register_functions(dbapi_connection, connection_record):
+        # Postgres NOW() used by the promotion/cleanup statements
+        dbapi_connection.create_function(
+            "NOW", 0, lambda: datetime.utcnow().isoformat(" ")
+        )
+
+    with engine.begin() as conn:
+        for statement in SCHEMA_SQL:
+            conn.execute(text(statement))
+
+    # Mirror the worker: the whole test runs inside one transaction
+    with engine.begin() as conn:
+        yield conn
+
+    engine.dispose()
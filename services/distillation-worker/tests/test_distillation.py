@@ -1,77 +1,195 @@
 """
 Tests for distillation worker
 """
+import json
 import pytest
-from unittest.mock import Mock, patch, MagicMock
-from app.distiller import MemoryDistiller
 from datetime import datetime, timedelta
+from uuid import uuid4
+from sqlalchemy import text
+
+from app.distiller import MemoryDistiller
+
+
+def insert_memory(conn, **values):
+    """Insert a memory row with sensible defaults and return its id"""
+    row = {
+        "id": str(uuid4()),
+        "user_id": str(uuid4()),
+        "type": "interaction",
+        "output_response": None,
+        "outcome": None,
+        "emotional_weight": None,
+        "confidence_score": None,
+        "constitution_valid": True,
+        "tags": None,
+        "tier": "stm",
+        "access_count": 0,
+        "created_at": datetime.utcnow(),
+        "expires_at": None,
+        "cleanup_at": None,
+    }
+    row.update(values)
+    conn.execute(text(f"""
+        INSERT INTO memories ({", ".join(row)})
+        VALUES ({", ".join(f":{column}" for column in row)})
+    """), row)
+    return row["id"]
+
 
+def topic_stats(topic="python", **overrides):
+    """Per-topic aggregate in the shape fetch_recent_reflections yields"""
+    stats = {
+        "topic": topic,
+        "reflection_count": 4,
+        "avg_emotional_weight": 0.5,
+        "avg_confidence": 0.8,
+        "success_count": 3,
+        "source_ids": [str(uuid4()) for _ in range(4)],
+        "user_id": str(uuid4()),
+    }
+    stats.update(overrides)
+    return stats
 
-class TestMemoryDistiller:
-    """Test suite for memory distillation"""
-    
-    @patch('app.distiller.httpx.AsyncClient')
-    def test_distill_memories_success(self, mock_client):
-        """Test successful memory distillation"""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "memories": [
-                {"id": "mem-1", "content": "Memory 1", "tier": "ITM"},
-                {"id": "mem-2", "content": "Memory 2", "tier": "ITM"}
-            ]
+
+@pytest.fixture
+def distiller(db_conn, monkeypatch):
+    """
+    Distiller on the SQLite connection.
+
+    The reflection aggregate and the output lookup use Postgres-only SQL
+    (LATERAL/unnest/array_agg, uuid[] casts), so tests feed them through
+    the `topics` and `outputs` attributes instead.
+    """
+    distiller = MemoryDistiller(db_conn)
+    distiller.topics = []
+    distiller.outputs = {}
+    monkeypatch.setattr(
+        distiller, "fetch_recent_reflections",
+        lambda hours=24: iter(distiller.topics)
+    )
+    monkeypatch.setattr(
+        distiller, "fetch_reflection_outputs",
+        lambda reflection_ids: {
+            reflection_id: distiller.outputs[reflection_id]
+            for reflection_id in reflection_ids
+            if reflection_id in distiller.outputs
         }
-        mock_client.return_value.__aenter__.return_value.get.return_value = mock_response
-        
-        distiller = MemoryDistiller()
+    )
+    return distiller
+
+
+class TestDistillationCriteria:
+    """Test suite for topic qualification"""
+
+    def test_qualifying_topic(self, db_conn):
+        """Test a confident, mostly successful topic qualifies"""
+        assert MemoryDistiller(db_conn).meets_distillation_criteria(topic_stats())
+
+    def test_too_few_reflections(self, db_conn):
+        """Test topics with a single reflection are skipped"""
+        stats = topic_stats(reflection_count=1, success_count=1)
+        assert not MemoryDistiller(db_conn).meets_distillation_criteria(stats)
+
+    def test_missing_scores(self, db_conn):
+        """Test topics without scores are skipped"""
+        stats = topic_stats(avg_confidence=None)
+        assert not MemoryDistiller(db_conn).meets_distillation_criteria(stats)
+
+    def test_low_signal(self, db_conn):
+        """Test topics with weak emotion and low confidence are skipped"""
+        stats = topic_stats(avg_emotional_weight=0.1, avg_confidence=0.5)
+        assert not MemoryDistiller(db_conn).meets_distillation_criteria(stats)
+
+    def test_low_success_rate(self, db_conn):
+        """Test topics with mostly failed outcomes are skipped"""
+        stats = topic_stats(success_count=1)
+        assert not MemoryDistiller(db_conn).meets_distillation_criteria(stats)
+
+
+class TestExtractPrinciple:
+    """Test suite for principle extraction"""
+
+    def test_combines_unique_a3_answers(self):
+        """Test A3 answers are deduplicated and joined in order"""
+        outputs = [
+            "A1: fine\nA3: Ask clarifying questions\nA4: done",
+            "A3: Ask clarifying questions",
+            "A3: Cite sources",
+        ]
+
+        principle = MemoryDistiller.extract_principle("python", outputs, 3)
+
+        assert principle == "For python: Ask clarifying questions; Cite sources"
+
+    def test_falls_back_without_a3(self):
+        """Test the generic principle when no A3 answer is present"""
+        principle = MemoryDistiller.extract_principle("python", ["A1: ok", "A3:\nnext"], 5)
+
+        assert principle == "General insights about python from 5 interactions"
+
+    def test_truncates_to_500_characters(self):
+        """Test long principles are truncated"""
+        principle = MemoryDistiller.extract_principle("python", ["A3: " + "x" * 600], 1)
+
+        assert len(principle) == 500
+
+
+class TestRunDistillation:
+    """Test suite for the full distillation run"""
+
+    def test_stores_qualifying_topics(self, distiller, db_conn):
+        """Test one distilled_knowledge row per qualifying topic"""
+        qualifying = topic_stats("python")
+        distiller.topics = [qualifying, topic_stats("rust", success_count=0)]
+        distiller.outputs = {qualifying["source_ids"][0]: "A3: Prefer generators"}
+
         result = distiller.run_distillation()
-        
+
         assert result["status"] == "success"
-        assert "distilled_count" in result
-    
-    def test_memory_promotion_logic(self):
-        """Test ITM to LTM promotion logic"""
-        distiller = MemoryDistiller()
-        
-        # Memory accessed frequently should promote
-        memory = {
-            "id": "mem-1",
-            "tier": "ITM",
-            "access_count": 10,
-            "created_at": (datetime.now() - timedelta(days=7)).isoformat()
-        }
-        
-        should_promote = distiller.should_promote_to_ltm(memory)
-        assert should_promote is True
-    
-    def test_expired_memory_cleanup(self):
-        """Test cleanup of expired memories"""
-        distiller = MemoryDistiller()
-        
-        # Old STM should be cleaned
-        old_memory = {
-            "tier": "STM",
-            "created_at": (datetime.now() - timedelta(days=2)).isoformat()
-        }
-        
-        should_delete = distiller.should_delete_memory(old_memory)
-        assert should_delete is True
-    
-    @patch('app.distiller.httpx.AsyncClient')
-    def test_distillation_aggregates_by_topic(self, mock_client):
-        """Test memories are aggregated by topic"""
-        mock_response = MagicMock()
-        mock_response.json.return_value = {
-            "memories": [
-                {"id": "1", "topic": "AI", "content": "Content 1"},
-                {"id": "2", "topic": "AI", "content": "Content 2"},
-                {"id": "3", "topic": "Python", "content": "Content 3"}
-            ]
-        }
-        mock_client.return_value.__aenter__.return_value.get.return_value = mock_response
-        
-        distiller = MemoryDistiller()
-        grouped = distiller.group_by_topic(mock_response.json()["memories"])
-        
-        assert "AI" in grouped
-        assert len(grouped["AI"]) == 2
+        assert result["reflections_processed"] == 8
+        assert result["knowledge_distilled"] == 1
+
+        rows = db_conn.execute(text(
+            "SELECT topic, principle, source_reflections, user_id FROM distilled_knowledge"
+        )).fetchall()
+        assert len(rows) == 1
+        assert rows[0][0] == "python"
+        assert rows[0][1] == "For python: Prefer generators"
+        assert json.loads(rows[0][2]) == qualifying["source_ids"]
+        assert rows[0][3] == qualifying["user_id"]
+
+    def test_no_topics(self, distiller, db_conn):
+        """Test an empty window still promotes and cleans up"""
+        result = distiller.run_distillation()
+
+        assert result["status"] == "success"
+        assert result["knowledge_distilled"] == 0
+        assert db_conn.execute(text("SELECT COUNT(*) FROM distilled_knowledge")).scalar() == 0
+
+    def test_promotes_frequently_accessed_itm(self, distiller, db_conn):
+        """Test ITM memories above the access threshold move to LTM"""
+        promoted = insert_memory(db_conn, tier="itm", access_count=5,
+                                 expires_at=datetime.utcnow() + timedelta(days=1))
+        rarely_used = insert_memory(db_conn, tier="itm", access_count=1)
+        invalid = insert_memory(db_conn, tier="itm", access_count=5, constitution_valid=False)
+
+        result = distiller.run_distillation()
+
+        assert result["memories_promoted"] == 1
+        tiers = dict(db_conn.execute(text("SELECT id, tier FROM memories")).fetchall())
+        assert tiers == {promoted: "ltm", rarely_used: "itm", invalid: "itm"}
+        expires_at = db_conn.execute(
+            text("SELECT expires_at FROM memories WHERE id = :id"), {"id": promoted}
+        ).scalar()
+        assert expires_at is None
+
+    def test_cleanup_marks_each_expired_memory_once(self, distiller, db_conn):
+        """Test expired STM/ITM memories are processed once, LTM never"""
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        insert_memory(db_conn, tier="stm", expires_at=yesterday)
+        insert_memory(db_conn, tier="itm", expires_at=yesterday)
+        insert_memory(db_conn, tier="ltm", expires_at=yesterday)
+        insert_memory(db_conn, tier="stm", expires_at=datetime.utcnow() + timedelta(days=1))
+
+        assert distiller.run_distillation()["memories_expired"] == 2
+        assert distiller.run_distillation()["memories_expired"] == 0
@@ -3,17 +3,20 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool
 from contextlib import contextmanager
-from app.config import settings
+from app.config import get_settings
 import logging
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
-# Create SQLAlchemy engine with connection pooling
+# Create SQLAlchemy engine with connection pooling.
+# Async routes run their DB calls in the threadpool (40 threads by default),
+# so size the pool to let every worker thread hold a connection.
 engine = create_engine(
     settings.database_url,
     poolclass=QueuePool,
-    pool_size=5,
-    max_overflow=10,
+    pool_size=20,
+    max_overflow=20,
     pool_pre_ping=True,  # Verify connections before using
     echo=False
 )
@@ -5,7 +5,7 @@ from prometheus_client import Counter, Histogram, Gauge
 chat_messages_total = Counter(
     'chat_messages_total',
     'Total number of chat messages processed',
-    ['user_id', 'session_type']  # session_type: 'standard' or 'streaming'
+    ['session_type']  # session_type: 'standard' or 'streaming'
 )
 
 chat_tokens_total = Counter(
@@ -28,16 +28,18 @@ ollama_request_total = Counter(
 )
 
 # Memory context metrics
-memory_context_size = Gauge(
-    'memory_context_size',
-    'Number of memory items in current context',
-    ['session_id']
+# Observed once per context build; a per-session gauge would keep one child
+# per session ever seen
+memory_context_size_items = Histogram(
+    'memory_context_size_items',
+    'Number of memory items in the built context',
+    buckets=[0, 1, 4, 16, 64, 256]
 )
 
 memory_context_tokens = Histogram(
     'memory_context_tokens',
     'Number of tokens used for memory context',
-    buckets=[0, 100, 500, 1000, 2000, 4000, 8000]
+    buckets=[500, 2000, 8000]  # Coarse: observed on every context build
 )
 
 # Session metrics
@@ -1,26 +1,131 @@
 """Middleware for Intelligence Service."""
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from uuid import uuid4
+import os
+from typing import Optional
 
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class CorrelationIdMiddleware(BaseHTTPMiddleware):
+
+class _UUIDPool:
+    """
+    Hands out random (version 4) UUID strings generated from one batched
+    os.urandom read instead of one syscall per UUID.
+    """
+
+    def __init__(self, size: int = 1024):
+        self._size = size
+        self._refill()
+        # A forked child must not hand out the parent's remaining IDs
+        os.register_at_fork(after_in_child=self._discard)
+
+    def _refill(self) -> None:
+        self._buffer = bytearray(os.urandom(16 * self._size))
+        self._index = 0
+
+    def _discard(self) -> None:
+        self._index = self._size
+
+    def next(self) -> str:
+        if self._index == self._size:
+            self._refill()
+
+        start = self._index * 16
+        self._index += 1
+        raw = self._buffer[start:start + 16]
+
+        # RFC 4122 version 4, variant 1
+        raw[6] = (raw[6] & 0x0F) | 0x40
+        raw[8] = (raw[8] & 0x3F) | 0x80
+
+        hex_id = raw.hex()
+        return f"{hex_id[:8]}-{hex_id[8:12]}-{hex_id[12:16]}-{hex_id[16:20]}-{hex_id[20:]}"
+
+
+class _LazyCorrelationId:
+    """Correlation ID that is only generated the first time it is read."""
+
+    __slots__ = ("_value", "_pool")
+
+    def __init__(self, header_value: Optional[str], pool: _UUIDPool):
+        self._value = header_value or None
+        self._pool = pool
+
+    @property
+    def materialized(self) -> bool:
+        return self._value is not None
+
+    def get(self) -> str:
+        if self._value is None:
+            self._value = self._pool.next()
+        return self._value
+
+    def __str__(self) -> str:
+        return self.get()
+
+
+class _RequestState(dict):
+    """
+    Request state dict that fills in the correlation ID on first read, so
+    request.state.correlation_id is always a plain str.
+    """
+
+    __slots__ = ("_correlation_id",)
+
+    def __init__(self, state: dict, correlation_id: _LazyCorrelationId):
+        super().__init__(state)
+        self._correlation_id = correlation_id
+
+    def __missing__(self, key: str) -> str:
+        if key != "correlation_id":
+            raise KeyError(key)
+        value = self["correlation_id"] = self._correlation_id.get()
+        return value
+
+
+class CorrelationIdMiddleware:
     """
     Middleware to add correlation IDs to requests and responses.
     Extracts X-Correlation-ID from request headers or generates a new one.
+    Scrape/probe endpoints don't get a generated ID unless something reads it.
+
+    Plain ASGI rather than BaseHTTPMiddleware, so requests don't pay for a
+    task group and memory stream per call.
     """
-    
-    async def dispatch(self, request: Request, call_next):
-        # Get correlation ID from header or generate new one
-        correlation_id = request.headers.get('x-correlation-id', str(uuid4()))
-        
-        # Attach to request state
-        request.state.correlation_id = correlation_id
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Add correlation ID to response headers
-        response.headers['X-Correlation-ID'] = correlation_id
-        
-        return response
+
+    SKIP_PATH_PREFIXES = ("/metrics", "/health")
+
+    def __init__(self, app: ASGIApp, uuid_pool_size: int = 1024):
+        self.app = app
+        self._uuid_pool = _UUIDPool(uuid_pool_size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Use the incoming header, or generate an ID on first read
+        header_value = None
+        for name, value in scope["headers"]:
+            if name == b"x-correlation-id":
+                header_value = value.decode("latin-1")
+                break
+        correlation_id = _LazyCorrelationId(header_value, self._uuid_pool)
+
+        # Attach to request state (backs request.state); a header value is
+        # stored as is, a generated one on first read
+        state = _RequestState(scope.get("state") or {}, correlation_id)
+        if header_value:
+            state["correlation_id"] = header_value
+        scope["state"] = state
+        skip = scope["path"].startswith(self.SKIP_PATH_PREFIXES)
+
+        async def send_with_correlation_id(message: Message) -> None:
+            # Add correlation ID to response headers
+            if message["type"] == "http.response.start" and (
+                correlation_id.materialized or not skip
+            ):
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-correlation-id", correlation_id.get().encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_correlation_id)
@@ -1,13 +1,27 @@
 """Pydantic schemas for request/response validation."""
-from pydantic import BaseModel, Field
-from typing import Optional, List, Union, Dict, Any
+from pydantic import BaseModel, Field, field_validator
+from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple, Union
 from datetime import datetime
 from uuid import UUID
 from enum import Enum
 
+from app.utils.sanitize import sanitize_message
+
+# Hot-path request models: immutable once validated
+_FROZEN_REQUEST_CONFIG = {"frozen": True}
+
+# Hot-path response models: built only by the service, so unknown fields are
+# a bug and can be rejected outright
+_FROZEN_RESPONSE_CONFIG = {"frozen": True, "extra": "forbid"}
+
+# Store enum fields as their plain (interned) string values
+_ENUM_VALUES_CONFIG = {"use_enum_values": True}
+
 
 class ChatMessage(BaseModel):
     """Chat message request."""
+    model_config = _FROZEN_REQUEST_CONFIG
+    
     message: str = Field(..., min_length=1, max_length=4000, description="User message")
     session_id: Optional[UUID] = Field(None, description="Session ID to continue conversation")
     use_memory: bool = Field(True, description="Whether to use memory context")
@@ -16,6 +30,8 @@ class ChatMessage(BaseModel):
 
 class ChatResponse(BaseModel):
     """Chat message response."""
+    model_config = _FROZEN_RESPONSE_CONFIG
+    
     response: str
     session_id: UUID
     tokens_used: int
@@ -24,6 +40,8 @@ class ChatResponse(BaseModel):
 
 class StreamChunk(BaseModel):
     """Streaming response chunk."""
+    model_config = _FROZEN_RESPONSE_CONFIG
+    
     content: str
     done: bool = False
     session_id: Optional[UUID] = None
@@ -69,6 +87,7 @@ class SessionHistoryResponse(BaseModel):
 
 class LLMProviderStatus(BaseModel):
     """Represents runtime health information for an LLM provider."""
+    model_config = _FROZEN_RESPONSE_CONFIG
 
     name: str
     healthy: bool
@@ -79,6 +98,40 @@ class LLMProviderStatus(BaseModel):
     cooling_down: bool = False
 
 
+# Validated status models keyed by their field values; health checks mostly
+# see the same provider state over and over
+_PROVIDER_STATUS_CACHE: Dict[tuple, LLMProviderStatus] = {}
+_PROVIDER_STATUS_CACHE_MAX = 256
+
+
+def build_provider_status(status: Any) -> LLMProviderStatus:
+    """Return the (shared) LLMProviderStatus for a provider status snapshot."""
+    key = (
+        status.name,
+        status.healthy,
+        status.enabled,
+        status.supports_streaming,
+        status.model,
+        status.last_error,
+        status.cooling_down,
+    )
+    cached = _PROVIDER_STATUS_CACHE.get(key)
+    if cached is None:
+        # last_error text varies, so keep the cache from growing unbounded
+        if len(_PROVIDER_STATUS_CACHE) >= _PROVIDER_STATUS_CACHE_MAX:
+            _PROVIDER_STATUS_CACHE.clear()
+        cached = _PROVIDER_STATUS_CACHE.setdefault(key, LLMProviderStatus(
+            name=status.name,
+            healthy=status.healthy,
+            enabled=status.enabled,
+            supports_streaming=status.supports_streaming,
+            model=status.model,
+            last_error=status.last_error,
+            cooling_down=status.cooling_down,
+        ))
+    return cached
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
     model_config = {"protected_namespaces": ()}
@@ -89,7 +142,7 @@ class HealthResponse(BaseModel):
     ollama: bool
     model_loaded: bool
     gpu_available: bool
-    providers: List[LLMProviderStatus] = Field(default_factory=list, description="LLM provider health snapshots")
+    providers: Tuple[LLMProviderStatus, ...] = Field(default=(), description="LLM provider health snapshots")
 
 
 
@@ -110,6 +163,8 @@ class QuestionType(str, Enum):
 
 class LessonMetadata(BaseModel):
     """Lesson metadata."""
+    model_config = _ENUM_VALUES_CONFIG
+
     title: str = Field(..., description="Lesson title")
     outcomes: List[str] = Field(..., min_length=1, description="Learning outcomes")
     difficulty: DifficultyLevel = Field(..., description="Difficulty level")
@@ -140,8 +195,8 @@ class GuidedPracticeTask(BaseModel):
     solution: str = Field(..., description="Complete solution with explanation")
 
 
-class AssessmentCheck(BaseModel):
-    """An assessment check for understanding."""
+class _AssessmentCheckBase(BaseModel):
+    """Fields shared by every assessment check."""
     type: QuestionType = Field(..., description="Question type")
     question: str = Field(..., description="Question text")
     choices: Optional[List[str]] = Field(None, description="Answer choices for MCQ")
@@ -149,6 +204,31 @@ class AssessmentCheck(BaseModel):
     explanation: str = Field(..., description="Explanation of correct answer")
 
 
+class MCQCheck(_AssessmentCheckBase):
+    """Multiple-choice check; the answer is a choice index or the choice itself."""
+    type: Literal[QuestionType.MCQ] = Field(..., description="Question type")
+    answer: Union[int, str] = Field(..., description="Correct answer")
+
+
+class ShortAnswerCheck(_AssessmentCheckBase):
+    """Short-answer check; numeric answers are kept as numbers."""
+    type: Literal[QuestionType.SHORT_ANSWER] = Field(..., description="Question type")
+    answer: Union[str, int, float] = Field(..., description="Correct answer")
+
+
+class TrueFalseCheck(_AssessmentCheckBase):
+    """True/false check."""
+    type: Literal[QuestionType.TRUE_FALSE] = Field(..., description="Question type")
+    answer: bool = Field(..., description="Correct answer")
+
+
+# An assessment check for understanding; `type` selects the answer validator
+AssessmentCheck = Annotated[
+    Union[MCQCheck, ShortAnswerCheck, TrueFalseCheck],
+    Field(discriminator="type"),
+]
+
+
 class Assessment(BaseModel):
     """Assessment section."""
     checks: List[AssessmentCheck] = Field(..., min_length=1, description="Checks for understanding")
@@ -163,10 +243,10 @@ class GlossaryTerm(BaseModel):
 
 class LessonArtifacts(BaseModel):
     """Generated artifacts for integration."""
-    quiz_items: List[Dict[str, Any]] = Field(default_factory=list, description="Quiz items")
-    notes_outline: List[Dict[str, Any]] = Field(default_factory=list, description="Notes outline")
-    code_snippets: List[Dict[str, Any]] = Field(default_factory=list, description="Code snippets")
-    glossary: List[GlossaryTerm] = Field(default_factory=list, description="Glossary terms")
+    quiz_items: Tuple[Dict[str, Any], ...] = Field(default=(), description="Quiz items")
+    notes_outline: Tuple[Dict[str, Any], ...] = Field(default=(), description="Notes outline")
+    code_snippets: Tuple[Dict[str, Any], ...] = Field(default=(), description="Code snippets")
+    glossary: Tuple[GlossaryTerm, ...] = Field(default=(), description="Glossary terms")
 
 
 class StructuredLesson(BaseModel):
@@ -183,15 +263,15 @@ class LearnerProfile(BaseModel):
     """Learner profile for personalization."""
     xp: int = Field(default=0, description="Total XP")
     current_level: int = Field(default=1, ge=1, le=24, description="Current level")
-    weak_topics: List[str] = Field(default_factory=list, description="Topics needing reinforcement")
-    prior_lessons: List[str] = Field(default_factory=list, description="Completed lesson IDs")
+    weak_topics: Tuple[str, ...] = Field(default=(), description="Topics needing reinforcement")
+    prior_lessons: Tuple[str, ...] = Field(default=(), description="Completed lesson IDs")
     preferences: Dict[str, Any] = Field(default_factory=dict, description="Learning preferences")
 
 
 class GenerationConstraints(BaseModel):
     """Constraints for lesson generation."""
     target_minutes: int = Field(default=30, ge=5, le=120, description="Target lesson duration")
-    prereqs: List[str] = Field(default_factory=list, description="Required prerequisites")
+    prereqs: Tuple[str, ...] = Field(default=(), description="Required prerequisites")
     require_ethics_guardrails: bool = Field(default=True, description="Apply ethics guardrails")
 
 
@@ -215,9 +295,20 @@ class GenerateLessonResponse(BaseModel):
 
 class EducatorChatMessage(BaseModel):
     """Chat message for educator/tutor."""
+    model_config = _FROZEN_REQUEST_CONFIG
+    
     message: str = Field(..., min_length=1, max_length=4000, description="User message")
     lesson_id: UUID = Field(..., description="Lesson ID for context")
     session_id: Optional[UUID] = Field(None, description="Session ID to continue conversation")
+    
+    @field_validator("message")
+    @classmethod
+    def _sanitize_message(cls, value: str) -> str:
+        """Strip HTML while the request is parsed; reject messages left empty."""
+        sanitized = sanitize_message(value, 4000)
+        if not sanitized:
+            raise ValueError("Message cannot be empty")
+        return sanitized
 
 
 class EducatorChatResponse(BaseModel):
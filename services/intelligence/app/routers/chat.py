@@ -1,40 +1,67 @@
 """Chat endpoints for Intelligence Core."""
-from fastapi import APIRouter, Depends, HTTPException, Header, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+import asyncio
 import time
 import logging
-import json
 
 from app.database import get_db
 from app.models.schemas import (
     ChatMessage, ChatResponse, SessionListResponse,
-    SessionHistoryResponse, SessionInfo, PromptInfo
+    SessionHistoryResponse, SessionInfo
 )
 from app.services.llm_router import llm_orchestrator, ProviderExhaustedError
 from app.services.session_service import SessionService
 from app.services.integration_service import integration_service
 from app.services.usage_service import usage_service
 from app.utils.token_counter import token_counter
+from app.utils.sse import SSE_ERROR_FRAME, prefetch_stream, sse_content_frame, sse_frame
 from app.utils.service_auth import verify_service_token_dependency, ServiceTokenPayload
 from app.utils.sanitize import sanitize_message
 from app.utils.metrics import (
     track_message_processing, track_tokens, track_memory_context,
-    increment_active_sessions, decrement_active_sessions
+    track_streaming_request, increment_active_sessions, decrement_active_sessions
 )
-from app.config import settings
+from app.metrics import memory_context_size_items, memory_context_tokens
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+# Daily token limits per tier (-1 = unlimited); settings are fixed at import
+TIER_TOKEN_LIMITS = MappingProxyType({
+    "free_trial": settings.free_tier_tokens_day,
+    "basic": settings.basic_tier_tokens_day,
+    "pro": settings.pro_tier_tokens_day
+})
+
 # Security constants
 MAX_MESSAGE_LENGTH = 10000  # Maximum message length in characters
 FALLBACK_RESPONSE = (
     "NovaCoreAI is still warming up. Please try again in a moment while we bring "
     "the intelligence service online."
 )
+SYSTEM_PROMPT = (
+    "You are Noble NovaCoreAI, an ethical AI assistant focused on truth, wisdom, "
+    "and human flourishing. Provide thoughtful, helpful responses aligned with the "
+    "Reclaimer Ethos."
+)
+# Sent with every chat request; counted once instead of per message
+SYSTEM_PROMPT_TOKENS = token_counter.count_tokens(SYSTEM_PROMPT)
+
+
+@lru_cache(maxsize=8192)
+def _parse_uuid(value: str) -> UUID:
+    # The same users send many requests; reuse the parsed header value
+    return UUID(value)
 
 
 def get_user_id(x_user_id: Optional[str] = Header(None)) -> UUID:
@@ -42,21 +69,14 @@ def get_user_id(x_user_id: Optional[str] = Header(None)) -> UUID:
     if not x_user_id:
         raise HTTPException(status_code=401, detail="User ID header missing")
     try:
-        return UUID(x_user_id)
+        return _parse_uuid(x_user_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid user ID format")
 
 
 def check_token_limit(db: Session, user_id: UUID, required_tokens: int, tier: str):
     """Check if user has remaining tokens for the day."""
-    # Get tier limits
-    tier_limits = {
-        "free_trial": settings.free_tier_tokens_day,
-        "basic": settings.basic_tier_tokens_day,
-        "pro": settings.pro_tier_tokens_day
-    }
-    
-    limit = tier_limits.get(tier, settings.free_tier_tokens_day)
+    limit = TIER_TOKEN_LIMITS.get(tier, settings.free_tier_tokens_day)
     
     # Pro tier has unlimited tokens
     if limit == -1:
@@ -74,6 +94,128 @@ def check_token_limit(db: Session, user_id: UUID, required_tokens: int, tier: st
     return True
 
 
+def check_message_quotas(
+    db: Session, user_id: UUID, tier: str, estimated_tokens: int
+) -> Optional[str]:
+    """
+    Check the token and message quotas with one usage query.
+
+    Returns the first quota error message, or None if the request is allowed.
+    """
+    results = usage_service.check_quotas(
+        db, user_id, tier, [("llm_tokens", estimated_tokens), ("messages", 1)]
+    )
+    for has_quota, quota_msg in results:
+        if not has_quota:
+            return quota_msg
+    return None
+
+
+@dataclass(slots=True)
+class ChatPrep:
+    """Everything a chat endpoint needs before calling the LLM."""
+    full_prompt: str
+    prompt_tokens: int
+    user_tier: str
+
+
+def sanitize_chat_message(message: ChatMessage) -> ChatMessage:
+    """Validate and sanitize the user's message, raising 400 on bad input."""
+    # Validate message content
+    if not message.message or not message.message.strip():
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    
+    # Sanitize message to prevent XSS attacks and validate length
+    try:
+        sanitized_message = sanitize_message(message.message, MAX_MESSAGE_LENGTH)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Update message with sanitized version
+    return message.model_copy(update={"message": sanitized_message})
+
+
+async def resolve_chat_session(db: Session, message: ChatMessage, user_id: UUID) -> UUID:
+    """Return the message's session ID, creating a new session if it has none."""
+    if message.session_id:
+        session = await run_in_threadpool(SessionService.get_session, db, message.session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return message.session_id
+    return await run_in_threadpool(SessionService.create_session, db, user_id, settings.llm_model)
+
+
+async def prepare_chat(
+    db: Session, message: ChatMessage, user_id: UUID, session_id: UUID
+) -> ChatPrep:
+    """
+    Build the prompt and enforce quotas for a chat message.
+
+    Raises 429 if the user is over their token or message quota.
+    """
+    # The tier lookup doesn't depend on the memory context; run them together
+    tier_task = asyncio.create_task(integration_service.get_user_tier(user_id))
+    
+    # Build context from memory service if requested
+    context = ""
+    if message.use_memory:
+        # Get memory context from Memory Service (STM + ITM + LTM)
+        memory_request = integration_service.get_memory_context(
+            user_id=user_id,
+            session_id=session_id if message.session_id else None,
+            limit=5,
+        )
+        history: List[dict] = []
+        if message.session_id:
+            # Read the local-history fallback alongside the memory call rather
+            # than after it comes back empty
+            memory_context, history = await asyncio.gather(
+                memory_request,
+                run_in_threadpool(
+                    SessionService.get_recent_history, db, message.session_id, limit=5
+                ),
+            )
+        else:
+            memory_context = await memory_request
+        
+        # Build context prompt from memory
+        context = integration_service.build_context_prompt(memory_context)
+        memory_counts = {
+            tier: len(memory_context.get(tier) or ()) for tier in ("stm", "itm", "ltm")
+        }
+        track_memory_context(memory_counts)
+        memory_context_size_items.observe(sum(memory_counts.values()))
+        memory_context_tokens.observe(token_counter.count_tokens(context) if context else 0)
+        
+        # Fallback to local history if memory service unavailable
+        if not context and history:
+            context = "".join(
+                f"User: {prompt['input_text']}\nAssistant: {prompt['output_text']}\n\n"
+                for prompt in history[-5:]  # Last 5 exchanges
+            )
+    
+    # Prepare prompt
+    full_prompt = f"{context}User: {message.message}\nAssistant:"
+    
+    # Estimate tokens for rate limiting
+    prompt_tokens = token_counter.count_tokens(full_prompt)
+    # The system prompt is sent too, so the quota gate counts it
+    estimated_tokens = SYSTEM_PROMPT_TOKENS + prompt_tokens + 500  # +500 for response
+    
+    # Subscription tier (fetched alongside the memory context)
+    user_tier = await tier_task
+    
+    # Check token and message quotas BEFORE processing message
+    quota_error = await run_in_threadpool(
+        check_message_quotas, db, user_id, user_tier, estimated_tokens
+    )
+    if quota_error:
+        track_message_processing("quota_exceeded")
+        raise HTTPException(status_code=429, detail=quota_error)
+    
+    return ChatPrep(full_prompt=full_prompt, prompt_tokens=prompt_tokens, user_tier=user_tier)
+
+
 @router.post("/sessions", response_model=SessionInfo, status_code=status.HTTP_201_CREATED)
 async def create_session_endpoint(
     user_id: UUID = Depends(get_user_id),
@@ -81,8 +223,8 @@ async def create_session_endpoint(
     service: ServiceTokenPayload = Depends(verify_service_token_dependency)
 ):
     """Create a new chat session for the current user."""
-    session_id = SessionService.create_session(db, user_id, settings.llm_model)
-    session = SessionService.get_session(db, session_id)
+    session_id = await run_in_threadpool(SessionService.create_session, db, user_id, settings.llm_model)
+    session = await run_in_threadpool(SessionService.get_session, db, session_id)
 
     if not session:
         raise HTTPException(status_code=500, detail="Failed to create chat session")
@@ -100,6 +242,7 @@ async def create_session_endpoint(
 @router.post("/message", response_model=ChatResponse)
 async def send_message(
     message: ChatMessage,
+    background_tasks: BackgroundTasks,
     user_id: UUID = Depends(get_user_id),
     db: Session = Depends(get_db),
     service: ServiceTokenPayload = Depends(verify_service_token_dependency)
@@ -107,32 +250,17 @@ async def send_message(
     """Send a message and get a response (non-streaming)."""
     start_time = time.time()
     
-    # Validate message content
-    if not message.message or not message.message.strip():
-        raise HTTPException(status_code=400, detail="Message cannot be empty")
-    
-    # Sanitize message to prevent XSS attacks and validate length
-    try:
-        sanitized_message = sanitize_message(message.message, MAX_MESSAGE_LENGTH)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    
-    # Update message with sanitized version
-    message.message = sanitized_message
+    message = sanitize_chat_message(message)
     
     # Get or create session
-    if message.session_id:
-        session = SessionService.get_session(db, message.session_id)
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        session_id = message.session_id
-    else:
-        session_id = SessionService.create_session(db, user_id, settings.llm_model)
+    session_id = await resolve_chat_session(db, message, user_id)
 
-    def build_fallback_response() -> ChatResponse:
+    async def build_fallback_response() -> ChatResponse:
+        track_message_processing("error")
         latency_ms = int((time.time() - start_time) * 1000)
         try:
-            SessionService.store_prompt(
+            await run_in_threadpool(
+                SessionService.store_prompt,
                 db,
                 session_id,
                 user_id,
@@ -160,60 +288,20 @@ async def send_message(
             "No LLM providers ready; returning fallback response",
             extra={"session_id": str(session_id)},
         )
-        return build_fallback_response()
+        return await build_fallback_response()
     
-    # Build context from memory service if requested
-    context = ""
-    if message.use_memory:
-        # Get memory context from Memory Service (STM + ITM + LTM)
-        memory_context = await integration_service.get_memory_context(
-            user_id=user_id,
-            session_id=session_id if message.session_id else None,
-            limit=5,
-        )
-        
-        # Build context prompt from memory
-        context = integration_service.build_context_prompt(memory_context)
-        
-        # Fallback to local history if memory service unavailable
-        if not context and message.session_id:
-            history = SessionService.get_session_history(db, message.session_id, limit=5)
-            for prompt in history[-5:]:  # Last 5 exchanges
-                context += f"User: {prompt['input_text']}\nAssistant: {prompt['output_text']}\n\n"
-    
-    # Prepare prompt
-    full_prompt = f"{context}User: {message.message}\nAssistant:"
-    
-    # Estimate tokens for rate limiting
-    estimated_tokens = token_counter.count_tokens(full_prompt) + 500  # +500 for response
-    
-    # Get user's subscription tier
-    user_tier = await integration_service.get_user_tier(user_id)
-    
-    # Check quota BEFORE processing message
-    has_quota, quota_msg = usage_service.check_quota(
-        db, user_id, user_tier, "llm_tokens", estimated_tokens
-    )
-    if not has_quota:
-        raise HTTPException(status_code=429, detail=quota_msg)
-    
-    # Also check message quota
-    has_message_quota, message_quota_msg = usage_service.check_quota(
-        db, user_id, user_tier, "messages", 1
-    )
-    if not has_message_quota:
-        raise HTTPException(status_code=429, detail=message_quota_msg)
+    # Memory context, prompt, tier and quota checks
+    prep = await prepare_chat(db, message, user_id, session_id)
     
     # Generate response
-    system_prompt = "You are Noble NovaCoreAI, an ethical AI assistant focused on truth, wisdom, and human flourishing. Provide thoughtful, helpful responses aligned with the Reclaimer Ethos."
     provider_name: Optional[str] = None
     provider_model: Optional[str] = None
     provider_latency_ms: Optional[int] = None
 
     try:
         provider_result = await llm_orchestrator.generate_response(
-            prompt=full_prompt,
-            system_prompt=system_prompt,
+            prompt=prep.full_prompt,
+            system_prompt=SYSTEM_PROMPT,
             temperature=0.7,
             max_tokens=2000,
         )
@@ -226,48 +314,52 @@ async def send_message(
                 "LLM returned empty response; using fallback",
                 extra={"session_id": str(session_id), "provider": provider_name},
             )
-            return build_fallback_response()
+            return await build_fallback_response()
     except ProviderExhaustedError as exc:
         logger.error(
             "All LLM providers exhausted; using fallback",
             extra={"session_id": str(session_id), "error": str(exc)},
         )
-        return build_fallback_response()
+        return await build_fallback_response()
     
-    # Calculate actual tokens used
-    tokens_used = token_counter.count_tokens(full_prompt + response_text)
+    # Calculate actual tokens used (the prompt is already counted)
+    output_tokens = token_counter.count_tokens(response_text)
+    tokens_used = prep.prompt_tokens + output_tokens
+    track_tokens(prep.prompt_tokens, output_tokens)
     latency_ms = provider_latency_ms if 'provider_latency_ms' in locals() else int((time.time() - start_time) * 1000)
     
     # Store the interaction
-    SessionService.store_prompt(
+    await run_in_threadpool(
+        SessionService.store_prompt,
         db, session_id, user_id, message.message, response_text, tokens_used, latency_ms
     )
     
-    # Record usage in ledger for billing/quota tracking
-    usage_service.record_usage(
+    # Record token usage (billing/quota) and the message count in one insert
+    await run_in_threadpool(
+        usage_service.record_usage_batch,
         db,
         user_id,
-        "llm_tokens",
-        tokens_used,
-        metadata={
-            "session_id": str(session_id),
-            "model": locals().get("provider_model", settings.llm_model),
-            "latency_ms": latency_ms,
-            "provider": locals().get("provider_name"),
-        },
-    )
-    
-    # Record message count for quota enforcement
-    usage_service.record_usage(
-        db,
-        user_id,
-        "messages",
-        1,
-        metadata={
-            "session_id": str(session_id),
-            "message_length": len(message.message),
-            "provider": locals().get("provider_name"),
-        },
+        [
+            {
+                "resource_type": "llm_tokens",
+                "amount": tokens_used,
+                "metadata": {
+                    "session_id": str(session_id),
+                    "model": locals().get("provider_model", settings.llm_model),
+                    "latency_ms": latency_ms,
+                    "provider": locals().get("provider_name"),
+                },
+            },
+            {
+                "resource_type": "messages",
+                "amount": 1,
+                "metadata": {
+                    "session_id": str(session_id),
+                    "message_length": len(message.message),
+                    "provider": locals().get("provider_name"),
+                },
+            },
+        ],
     )
     
     # Store in STM (Short-Term Memory) for fast context retrieval
@@ -279,8 +371,10 @@ async def send_message(
         tokens=tokens_used,
     )
     
-    # Trigger reflection worker asynchronously
-    integration_service.trigger_reflection(
+    # Queue the reflection task once the response has been sent, so the
+    # broker publish isn't on the request path
+    background_tasks.add_task(
+        integration_service.trigger_reflection,
         user_id=user_id,
         session_id=session_id,
         input_text=message.message,
@@ -292,6 +386,7 @@ async def send_message(
         },
     )
     
+    track_message_processing("success")
     logger.info(
         "Message processed.",
         extra={
@@ -313,12 +408,19 @@ async def send_message(
 @router.post("", response_model=ChatResponse, include_in_schema=False)
 async def send_message_legacy(
     message: ChatMessage,
+    background_tasks: BackgroundTasks,
     user_id: UUID = Depends(get_user_id),
     db: Session = Depends(get_db),
     service: ServiceTokenPayload = Depends(verify_service_token_dependency)
 ):
     """Backward-compatible handler for legacy POST /chat endpoint."""
-    return await send_message(message=message, user_id=user_id, db=db, service=service)
+    return await send_message(
+        message=message,
+        background_tasks=background_tasks,
+        user_id=user_id,
+        db=db,
+        service=service,
+    )
 
 
 @router.post("/stream")
@@ -331,86 +433,116 @@ async def stream_message(
     """Send a message and stream the response."""
     start_time = time.time()
     
-    # Validate message content
-    if not message.message or not message.message.strip():
-        raise HTTPException(status_code=400, detail="Message cannot be empty")
-    
-    # Sanitize message to prevent XSS attacks and validate length
-    try:
-        sanitized_message = sanitize_message(message.message, MAX_MESSAGE_LENGTH)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    
-    # Update message with sanitized version
-    message.message = sanitized_message
+    message = sanitize_chat_message(message)
     
     # Check if Ollama is ready
     if not await llm_orchestrator.ensure_ready():
         raise HTTPException(status_code=503, detail="LLM service not ready")
     
     # Get or create session
-    if message.session_id:
-        session = SessionService.get_session(db, message.session_id)
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        session_id = message.session_id
-    else:
-        session_id = SessionService.create_session(db, user_id, settings.llm_model)
+    session_id = await resolve_chat_session(db, message, user_id)
     
-    # Build context from memory service if requested
-    context = ""
-    if message.use_memory:
-        # Get memory context from Memory Service
-        memory_context = await integration_service.get_memory_context(
-            user_id=user_id,
-            session_id=session_id if message.session_id else None,
-            limit=5
-        )
+    # Memory context, prompt, tier and quota checks
+    prep = await prepare_chat(db, message, user_id, session_id)
+    
+    background = BackgroundTasks()
+
+    async def record_stream_interaction(
+        response_text: str,
+        tokens_used: int,
+        latency_ms: int,
+        provider_name: Optional[str],
+        provider_model: Optional[str],
+    ) -> None:
+        """Store the streamed interaction, usage, STM entry and reflection."""
+        try:
+            await run_in_threadpool(
+                SessionService.store_prompt,
+                db,
+                session_id,
+                user_id,
+                message.message,
+                response_text,
+                tokens_used,
+                latency_ms,
+            )
+        except Exception as e:
+            logger.error(f"Failed to store streamed prompt: {e}", exc_info=True)
         
-        # Build context prompt from memory
-        context = integration_service.build_context_prompt(memory_context)
+        # Record token usage (billing/quota) and the message count in one insert
+        try:
+            await run_in_threadpool(
+                usage_service.record_usage_batch,
+                db,
+                user_id,
+                [
+                    {
+                        "resource_type": "llm_tokens",
+                        "amount": tokens_used,
+                        "metadata": {
+                            "session_id": str(session_id),
+                            "model": provider_model,
+                            "latency_ms": latency_ms,
+                            "streaming": True,
+                            "provider": provider_name,
+                        },
+                    },
+                    {
+                        "resource_type": "messages",
+                        "amount": 1,
+                        "metadata": {
+                            "session_id": str(session_id),
+                            "message_length": len(message.message),
+                            "model": provider_model,
+                            "provider": provider_name,
+                        },
+                    },
+                ],
+            )
+        except Exception as e:
+            logger.warning(f"Failed to record usage: {e}")
         
-        # Fallback to local history if memory service unavailable
-        if not context and message.session_id:
-            history = SessionService.get_session_history(db, message.session_id, limit=5)
-            for prompt in history[-5:]:
-                context += f"User: {prompt['input_text']}\nAssistant: {prompt['output_text']}\n\n"
-    
-    # Prepare prompt
-    full_prompt = f"{context}User: {message.message}\nAssistant:"
-    
-    # Estimate tokens for rate limiting
-    estimated_tokens = token_counter.count_tokens(full_prompt) + 500
-    
-    # Get user's subscription tier
-    user_tier = await integration_service.get_user_tier(user_id)
-    
-    # Check quota BEFORE processing message
-    has_quota, quota_msg = usage_service.check_quota(
-        db, user_id, user_tier, "llm_tokens", estimated_tokens
-    )
-    if not has_quota:
-        raise HTTPException(status_code=429, detail=quota_msg)
-    
-    # Also check message quota
-    has_message_quota, message_quota_msg = usage_service.check_quota(
-        db, user_id, user_tier, "messages", 1
-    )
-    if not has_message_quota:
-        raise HTTPException(status_code=429, detail=message_quota_msg)
+        # Store in STM for fast context retrieval
+        try:
+            await integration_service.store_stm_interaction(
+                user_id=user_id,
+                session_id=session_id,
+                input_text=message.message,
+                output_text=response_text,
+                tokens=tokens_used
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store STM: {e}")
+        
+        # Trigger reflection worker asynchronously; publishing blocks on the
+        # broker, so keep it off the event loop
+        try:
+            await run_in_threadpool(
+                integration_service.trigger_reflection,
+                user_id=user_id,
+                session_id=session_id,
+                input_text=message.message,
+                output_text=response_text,
+                context={
+                    "tokens_used": tokens_used,
+                    "latency_ms": latency_ms,
+                    "provider": provider_name,
+                },
+            )
+        except Exception as e:
+            logger.warning(f"Failed to trigger reflection: {e}")
     
     async def generate():
         """Generate streaming response."""
-        accumulated_response = ""
-        system_prompt = "You are Noble NovaCoreAI, an ethical AI assistant focused on truth, wisdom, and human flourishing. Provide thoughtful, helpful responses aligned with the Reclaimer Ethos."
+        response_parts: List[str] = []
         provider_name: Optional[str] = None
         provider_model: Optional[str] = None
         
         try:
             try:
                 provider_name, provider_model, stream = await llm_orchestrator.generate_streaming_response(
-                    prompt=full_prompt,
-                    system_prompt=system_prompt,
+                    prompt=prep.full_prompt,
+                    system_prompt=SYSTEM_PROMPT,
                     temperature=0.7,
                     max_tokens=2000,
                 )
@@ -421,95 +553,40 @@ async def stream_message(
                 )
                 raise HTTPException(status_code=503, detail="LLM providers unavailable") from exc
 
-            async for chunk in stream:
-                if chunk:
-                    accumulated_response += chunk
-                    # Send chunk as SSE
-                    data = json.dumps({"content": chunk, "done": False})
-                    yield f"data: {data}\n\n"
+            async for chunk in prefetch_stream(stream):
+                response_parts.append(chunk)
+                # Send chunk as SSE
+                yield sse_content_frame(chunk)
+            accumulated_response = "".join(response_parts)
             
             # Calculate metrics
-            tokens_used = token_counter.count_tokens(full_prompt + accumulated_response)
+            output_tokens = token_counter.count_tokens(accumulated_response)
+            tokens_used = prep.prompt_tokens + output_tokens
+            track_tokens(prep.prompt_tokens, output_tokens)
             latency_ms = int((time.time() - start_time) * 1000)
             
-            # Store the interaction
-            SessionService.store_prompt(
-                db,
-                session_id,
-                user_id,
-                message.message,
+            # Persist the interaction after the response has been sent, so
+            # the client gets its done event without waiting on DB/STM writes
+            background.add_task(
+                record_stream_interaction,
                 accumulated_response,
                 tokens_used,
                 latency_ms,
+                provider_name,
+                provider_model,
             )
             
-            # Record usage in ledger for billing/quota tracking
-            try:
-                usage_service.record_usage(
-                    db, user_id, "llm_tokens", tokens_used,
-                    metadata={
-                        "session_id": str(session_id),
-                        "model": provider_model,
-                        "latency_ms": latency_ms,
-                        "streaming": True,
-                        "provider": provider_name,
-                    }
-                )
-                
-                # Record message count for quota enforcement
-                usage_service.record_usage(
-                    db,
-                    user_id,
-                    "messages",
-                    1,
-                    metadata={
-                        "session_id": str(session_id),
-                        "message_length": len(message.message),
-                        "model": provider_model,
-                        "provider": provider_name,
-                    },
-                )
-            except Exception as e:
-                logger.warning(f"Failed to record usage: {e}")
-            
-            # Store in STM for fast context retrieval (don't await in generator)
-            try:
-                await integration_service.store_stm_interaction(
-                    user_id=user_id,
-                    session_id=session_id,
-                    input_text=message.message,
-                    output_text=accumulated_response,
-                    tokens=tokens_used
-                )
-            except Exception as e:
-                logger.warning(f"Failed to store STM: {e}")
-            
-            # Trigger reflection worker asynchronously
-            try:
-                integration_service.trigger_reflection(
-                    user_id=user_id,
-                    session_id=session_id,
-                    input_text=message.message,
-                    output_text=accumulated_response,
-                    context={
-                        "tokens_used": tokens_used,
-                        "latency_ms": latency_ms,
-                        "provider": provider_name,
-                    },
-                )
-            except Exception as e:
-                logger.warning(f"Failed to trigger reflection: {e}")
-            
             # Send final chunk with metadata
-            data = json.dumps({
+            yield sse_frame({
                 "content": "",
                 "done": True,
                 "session_id": str(session_id),
                 "tokens_used": tokens_used,
                 "latency_ms": latency_ms
             })
-            yield f"data: {data}\n\n"
             
+            track_message_processing("success")
+            track_streaming_request("success")
             logger.info(
                 "Stream completed",
                 extra={
@@ -523,12 +600,14 @@ async def stream_message(
             
         except Exception as e:
             logger.error(f"Streaming error: {e}", exc_info=True)
-            error_data = json.dumps({"error": "An error occurred while processing your request", "done": True})
-            yield f"data: {error_data}\n\n"
+            track_message_processing("error")
+            track_streaming_request("error")
+            yield SSE_ERROR_FRAME
     
     return StreamingResponse(
         generate(),
         media_type="text/event-stream",
+        background=background,
         headers={
             "Cache-Control": "no-cache",
             "X-Accel-Buffering": "no"
@@ -543,21 +622,11 @@ async def get_sessions(
     service: ServiceTokenPayload = Depends(verify_service_token_dependency)
 ):
     """Get all sessions for the current user."""
-    sessions_data = SessionService.get_user_sessions(db, user_id, limit=50)
-    
-    sessions = [
-        SessionInfo(
-            id=s["id"],
-            user_id=s["user_id"],
-            status=s["status"],
-            model_name=s["model_name"],
-            created_at=s["created_at"],
-            ended_at=s["ended_at"]
-        )
-        for s in sessions_data
-    ]
+    sessions_data = await run_in_threadpool(SessionService.get_user_sessions, db, user_id, limit=50)
     
-    return SessionListResponse(sessions=sessions, total=len(sessions))
+    # Rows already have the SessionInfo fields; response_model validates
+    # them once on the way out instead of building each model here too
+    return {"sessions": sessions_data, "total": len(sessions_data)}
 
 
 @router.get("/history/{session_id}", response_model=SessionHistoryResponse)
@@ -568,35 +637,24 @@ async def get_history(
     service: ServiceTokenPayload = Depends(verify_service_token_dependency)
 ):
     """Get conversation history for a session."""
-    # Verify session belongs to user
-    session = SessionService.get_session(db, session_id)
+    # Session and history in one round trip; verify the session belongs to user
+    session = await run_in_threadpool(
+        SessionService.get_session_with_history, db, session_id, limit=100
+    )
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
     if str(session["user_id"]) != str(user_id):
         raise HTTPException(status_code=403, detail="Access denied")
     
-    prompts_data = SessionService.get_session_history(db, session_id, limit=100)
-    
-    prompts = [
-        PromptInfo(
-            id=p["id"],
-            session_id=p["session_id"],
-            user_id=p["user_id"],
-            input_text=p["input_text"],
-            output_text=p["output_text"],
-            tokens_used=p["tokens_used"],
-            latency_ms=p["latency_ms"],
-            created_at=p["created_at"]
-        )
-        for p in prompts_data
-    ]
+    prompts_data = session["prompts"]
     
-    return SessionHistoryResponse(
-        session_id=session_id,
-        prompts=prompts,
-        total=len(prompts)
-    )
+    # Validated once by response_model, as in get_sessions
+    return {
+        "session_id": session_id,
+        "prompts": prompts_data,
+        "total": len(prompts_data)
+    }
 
 
 @router.post("/sessions/{session_id}/end")
@@ -607,14 +665,13 @@ async def end_session(
     service: ServiceTokenPayload = Depends(verify_service_token_dependency)
 ):
     """End a chat session."""
-    # Verify session belongs to user
-    session = SessionService.get_session(db, session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    if str(session["user_id"]) != str(user_id):
+    # Ownership is part of the UPDATE; only look the session up to tell a
+    # missing session from someone else's
+    ended = await run_in_threadpool(SessionService.end_session, db, session_id, user_id)
+    if not ended:
+        session = await run_in_threadpool(SessionService.get_session, db, session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
         raise HTTPException(status_code=403, detail="Access denied")
     
-    SessionService.end_session(db, session_id)
-    
     return {"message": "Session ended", "session_id": str(session_id)}
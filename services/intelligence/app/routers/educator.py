@@ -1,32 +1,37 @@
 """Educator endpoints for lesson generation and tutoring."""
-from fastapi import APIRouter, Depends, HTTPException, Header, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
+from dataclasses import dataclass
+import asyncio
 import time
 import logging
-import json
 
 from app.database import get_db
 from app.models.schemas import (
     GenerateLessonRequest, GenerateLessonResponse,
     EducatorChatMessage, EducatorChatResponse,
-    SessionInfo, StructuredLesson
+    DifficultyLevel, QuestionType, SessionInfo, StructuredLesson
 )
 from app.services.llm_router import llm_orchestrator, ProviderExhaustedError
 from app.services.session_service import SessionService
 from app.services.integration_service import integration_service
 from app.services.usage_service import usage_service
 from app.utils.token_counter import token_counter
+from app.utils.sse import (
+    SSE_ERROR_FRAME, SSE_UNAVAILABLE_FRAME, prefetch_stream, sse_content_frame, sse_frame
+)
 from app.utils.service_auth import verify_service_token_dependency, ServiceTokenPayload
-from app.utils.sanitize import sanitize_message
-from app.config import settings
+from app.utils.jsonfence import strip_fence
+from app.utils.responses import FastJSONResponse
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/educator", tags=["educator"])
-
-# Security constants
-MAX_MESSAGE_LENGTH = 10000
+settings = get_settings()
+router = APIRouter(prefix="/educator", default_response_class=FastJSONResponse, tags=["educator"])
 
 
 def get_user_id(x_user_id: Optional[str] = Header(None)) -> UUID:
@@ -39,10 +44,7 @@ def get_user_id(x_user_id: Optional[str] = Header(None)) -> UUID:
         raise HTTPException(status_code=400, detail="Invalid user ID format")
 
 
-def build_lesson_generation_prompt(request: GenerateLessonRequest) -> tuple[str, str]:
-    """Build system and user prompts for lesson generation."""
-    
-    system_prompt = """You are a master educator and AI tutor specializing in the Noble Growth School curriculum. Your role is to create comprehensive, engaging lessons that teach before assigning tasks.
+LESSON_SYSTEM_PROMPT = """You are a master educator and AI tutor specializing in the Noble Growth School curriculum. Your role is to create comprehensive, engaging lessons that teach before assigning tasks.
 
 Core Principles:
 - Build conceptual clarity through clear explanations and concrete examples
@@ -55,27 +57,32 @@ Core Principles:
 Output Format:
 You MUST respond with valid JSON matching the StructuredLesson schema. Include all required sections: metadata, teach, guided_practice, assessment, summary, and artifacts."""
 
-    learner_context = f"""
-Learner Profile:
-- Current Level: {request.learner_profile.current_level} of 24
-- Total XP: {request.learner_profile.xp}
-- Weak Topics: {', '.join(request.learner_profile.weak_topics) if request.learner_profile.weak_topics else 'None identified'}
-- Prior Lessons: {len(request.learner_profile.prior_lessons)} completed
-"""
 
-    constraints_text = f"""
-Constraints:
-- Target Duration: {request.constraints.target_minutes} minutes
-- Prerequisites: {', '.join(request.constraints.prereqs) if request.constraints.prereqs else 'None'}
-- Ethics Guardrails: {'Required' if request.constraints.require_ethics_guardrails else 'Optional'}
-"""
+def build_lesson_generation_prompt(request: GenerateLessonRequest) -> tuple[str, str]:
+    """Build system and user prompts for lesson generation."""
+    profile = request.learner_profile
+    constraints = request.constraints
+    weak_topics = ", ".join(profile.weak_topics) or "None identified"
+    prereqs = ", ".join(constraints.prereqs) or "None"
+    ethics = "Required" if constraints.require_ethics_guardrails else "Optional"
 
     user_prompt = f"""Generate a comprehensive lesson for Level {request.level_number} of the Noble Growth School curriculum.
 
 Lesson Summary: {request.lesson_summary}
 
-{learner_context}
-{constraints_text}
+
+Learner Profile:
+- Current Level: {profile.current_level} of 24
+- Total XP: {profile.xp}
+- Weak Topics: {weak_topics}
+- Prior Lessons: {len(profile.prior_lessons)} completed
+
+
+Constraints:
+- Target Duration: {constraints.target_minutes} minutes
+- Prerequisites: {prereqs}
+- Ethics Guardrails: {ethics}
+
 
 Create a structured lesson with:
 1. Clear learning outcomes and difficulty assessment
@@ -87,64 +94,68 @@ Create a structured lesson with:
 
 Respond ONLY with valid JSON matching the StructuredLesson schema. No additional text."""
 
-    return system_prompt, user_prompt
+    return LESSON_SYSTEM_PROMPT, user_prompt
+
+
+# Answer-choice labels for MCQ checks
+_CHOICE_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Display names by difficulty value (LessonMetadata stores the plain value)
+_DIFFICULTY_DISPLAY = {level.value: level.value.title() for level in DifficultyLevel}
 
 
 def compile_lesson_to_markdown(lesson: StructuredLesson) -> str:
     """Compile structured lesson to markdown format."""
-    
-    md_parts = []
-    
-    md_parts.append(f"# {lesson.metadata.title}\n")
-    md_parts.append(f"**Difficulty:** {lesson.metadata.difficulty.value.title()}\n")
-    md_parts.append(f"**Estimated Time:** {lesson.metadata.estimated_minutes} minutes\n")
-    
-    md_parts.append("\n## Learning Outcomes\n")
-    for outcome in lesson.metadata.outcomes:
-        md_parts.append(f"- {outcome}\n")
-    
-    if lesson.metadata.prerequisites:
+    metadata = lesson.metadata
+    teach = lesson.teach
+    
+    md_parts = [
+        f"# {metadata.title}\n"
+        f"**Difficulty:** {_DIFFICULTY_DISPLAY[metadata.difficulty]}\n"
+        f"**Estimated Time:** {metadata.estimated_minutes} minutes\n"
+        "\n## Learning Outcomes\n"
+    ]
+    md_parts.extend(f"- {outcome}\n" for outcome in metadata.outcomes)
+    
+    if metadata.prerequisites:
         md_parts.append("\n## Prerequisites\n")
-        for prereq in lesson.metadata.prerequisites:
-            md_parts.append(f"- {prereq}\n")
-    
-    md_parts.append("\n## Overview\n")
-    md_parts.append(f"{lesson.teach.overview}\n")
+        md_parts.extend(f"- {prereq}\n" for prereq in metadata.prerequisites)
     
-    md_parts.append("\n## Key Concepts\n")
-    for concept in lesson.teach.concepts:
-        md_parts.append(f"\n### {concept.name}\n")
-        md_parts.append(f"{concept.explanation}\n")
-        md_parts.append(f"\n**Example:** {concept.example}\n")
+    md_parts.append(f"\n## Overview\n{teach.overview}\n\n## Key Concepts\n")
+    for concept in teach.concepts:
+        md_parts.append(
+            f"\n### {concept.name}\n{concept.explanation}\n\n**Example:** {concept.example}\n"
+        )
         if concept.analogy:
             md_parts.append(f"\n**Analogy:** {concept.analogy}\n")
     
     md_parts.append("\n## Step-by-Step Instructions\n")
-    for i, step in enumerate(lesson.teach.steps, 1):
-        md_parts.append(f"{i}. {step}\n")
+    md_parts.extend(f"{i}. {step}\n" for i, step in enumerate(teach.steps, 1))
     
     md_parts.append("\n## Guided Practice\n")
-    for i, task in enumerate(lesson.guided_practice, 1):
-        md_parts.append(f"\n### Practice Task {i}\n")
-        md_parts.append(f"{task.task}\n")
-        md_parts.append(f"\n<details>\n<summary>Hint</summary>\n{task.hint}\n</details>\n")
-        md_parts.append(f"\n<details>\n<summary>Solution</summary>\n{task.solution}\n</details>\n")
+    md_parts.extend(
+        f"\n### Practice Task {i}\n{task.task}\n"
+        f"\n<details>\n<summary>Hint</summary>\n{task.hint}\n</details>\n"
+        f"\n<details>\n<summary>Solution</summary>\n{task.solution}\n</details>\n"
+        for i, task in enumerate(lesson.guided_practice, 1)
+    )
     
     md_parts.append("\n## Check Your Understanding\n")
     for i, check in enumerate(lesson.assessment.checks, 1):
         md_parts.append(f"\n**Question {i}:** {check.question}\n")
-        if check.type.value == "mcq" and check.choices:
-            for j, choice in enumerate(check.choices):
-                md_parts.append(f"{chr(65+j)}. {choice}\n")
-        md_parts.append(f"\n<details>\n<summary>Answer & Explanation</summary>\n{check.explanation}\n</details>\n")
+        if check.type is QuestionType.MCQ and check.choices:
+            md_parts.extend(
+                f"{letter}. {choice}\n" for letter, choice in zip(_CHOICE_LETTERS, check.choices)
+            )
+        md_parts.append(
+            f"\n<details>\n<summary>Answer & Explanation</summary>\n{check.explanation}\n</details>\n"
+        )
     
-    md_parts.append("\n## Summary\n")
-    md_parts.append(f"{lesson.summary}\n")
+    md_parts.append(f"\n## Summary\n{lesson.summary}\n")
     
     if lesson.artifacts.glossary:
         md_parts.append("\n## Glossary\n")
-        for term in lesson.artifacts.glossary:
-            md_parts.append(f"**{term.term}:** {term.definition}\n")
+        md_parts.extend(f"**{term.term}:** {term.definition}\n" for term in lesson.artifacts.glossary)
     
     return "".join(md_parts)
 
@@ -152,11 +163,17 @@ def compile_lesson_to_markdown(lesson: StructuredLesson) -> str:
 @router.post("/generate", response_model=GenerateLessonResponse)
 async def generate_lesson(
     request: GenerateLessonRequest,
+    include_markdown: bool = Query(True, description="Compile content_markdown into the response"),
     user_id: UUID = Depends(get_user_id),
     db: Session = Depends(get_db),
     service: ServiceTokenPayload = Depends(verify_service_token_dependency)
 ):
-    """Generate a structured lesson using AI."""
+    """
+    Generate a structured lesson using AI.
+
+    With include_markdown=false, content_markdown is left empty; clients can
+    render it later through POST /educator/lessons/markdown.
+    """
     start_time = time.time()
     
     if not await llm_orchestrator.ensure_ready():
@@ -167,7 +184,10 @@ async def generate_lesson(
     
     system_prompt, user_prompt = build_lesson_generation_prompt(request)
     
-    estimated_tokens = token_counter.count_tokens(system_prompt + user_prompt) + 2000
+    # Counted separately so the (cached) system prompt count is reused and
+    # usage below only has to tokenize the response
+    prompt_tokens = token_counter.count_tokens(system_prompt) + token_counter.count_tokens(user_prompt)
+    estimated_tokens = prompt_tokens + 2000
     
     has_quota, quota_msg = usage_service.check_quota(
         db, user_id, user_tier, "llm_tokens", estimated_tokens
@@ -194,25 +214,23 @@ async def generate_lesson(
         raise HTTPException(status_code=503, detail="LLM providers unavailable")
     
     try:
-        json_text = response_text.strip()
-        if json_text.startswith("```json"):
-            json_text = json_text.split("```json")[1].split("```")[0].strip()
-        elif json_text.startswith("```"):
-            json_text = json_text.split("```")[1].split("```")[0].strip()
+        json_text = strip_fence(response_text)
         
-        lesson_data = json.loads(json_text)
-        structured_lesson = StructuredLesson(**lesson_data)
+        # Parse and validate in one pass, without an intermediate dict
+        structured_lesson = StructuredLesson.model_validate_json(json_text)
         
-    except (json.JSONDecodeError, ValueError) as e:
+    except ValueError as e:  # includes pydantic's ValidationError for bad JSON
         logger.error(f"Failed to parse lesson JSON: {e}\nResponse: {response_text[:500]}")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to parse lesson structure: {str(e)}"
         )
     
-    content_markdown = compile_lesson_to_markdown(structured_lesson)
+    content_markdown = ""
+    if include_markdown:
+        content_markdown = await run_in_threadpool(compile_lesson_to_markdown, structured_lesson)
     
-    tokens_used = token_counter.count_tokens(system_prompt + user_prompt + response_text)
+    tokens_used = prompt_tokens + token_counter.count_tokens(response_text)
     latency_ms = int((time.time() - start_time) * 1000)
     
     usage_service.record_usage(
@@ -245,29 +263,38 @@ async def generate_lesson(
     )
 
 
-@router.post("/chat/message", response_model=EducatorChatResponse)
-async def educator_chat(
-    message: EducatorChatMessage,
-    user_id: UUID = Depends(get_user_id),
-    db: Session = Depends(get_db),
+@router.post("/lessons/markdown", response_class=Response)
+async def render_lesson_markdown(
+    lesson: StructuredLesson,
     service: ServiceTokenPayload = Depends(verify_service_token_dependency)
 ):
-    """Chat with educator/tutor about a specific lesson."""
-    start_time = time.time()
-    
-    if not message.message or not message.message.strip():
-        raise HTTPException(status_code=400, detail="Message cannot be empty")
-    
-    try:
-        sanitized_message = sanitize_message(message.message, MAX_MESSAGE_LENGTH)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    
-    message.message = sanitized_message
-    
-    if not await llm_orchestrator.ensure_ready():
-        raise HTTPException(status_code=503, detail="LLM service not ready")
-    
+    """Render a structured lesson (e.g. one generated without markdown) as markdown."""
+    content_markdown = await run_in_threadpool(compile_lesson_to_markdown, lesson)
+    return Response(content=content_markdown, media_type="text/markdown; charset=utf-8")
+
+
+TUTOR_SYSTEM_PROMPT = (
+    "You are a patient, knowledgeable tutor helping students learn. Provide clear "
+    "explanations, encourage critical thinking, and adapt to the student's level."
+)
+
+
+@dataclass(slots=True)
+class TutorPrep:
+    """Session, prompt and token estimate for an educator chat turn."""
+    session_id: UUID
+    full_prompt: str
+    prompt_tokens: int
+
+
+async def prepare_educator_chat(
+    db: Session, message: EducatorChatMessage, user_id: UUID
+) -> TutorPrep:
+    """
+    Resolve the session, build the tutor prompt and enforce the token quota.
+
+    Raises 404 for an unknown session and 429 if the user is over quota.
+    """
     # Get or create session
     if message.session_id:
         session = SessionService.get_session(db, message.session_id)
@@ -277,36 +304,88 @@ async def educator_chat(
     else:
         session_id = SessionService.create_session(db, user_id, settings.llm_model)
     
-    context = f"You are tutoring a student on Lesson {message.lesson_id}. "
-    context += "Provide clear explanations, helpful hints, and check their understanding. "
-    context += "Be encouraging and supportive.\n\n"
-    
-    memory_context = await integration_service.get_memory_context(
-        user_id=user_id,
-        session_id=session_id,
-        limit=5
+    # Memory context and tier are independent lookups; fetch them together
+    memory_context, user_tier = await asyncio.gather(
+        integration_service.get_memory_context(
+            user_id=user_id,
+            session_id=session_id,
+            limit=5
+        ),
+        integration_service.get_user_tier(user_id),
     )
-    context += integration_service.build_context_prompt(memory_context)
     
     # Prepare prompt
-    full_prompt = f"{context}Student: {message.message}\nTutor:"
+    memory_prompt = integration_service.build_context_prompt(memory_context)
+    full_prompt = (
+        f"You are tutoring a student on Lesson {message.lesson_id}. "
+        "Provide clear explanations, helpful hints, and check their understanding. "
+        "Be encouraging and supportive.\n\n"
+        f"{memory_prompt}Student: {message.message}\nTutor:"
+    )
     
-    estimated_tokens = token_counter.count_tokens(full_prompt) + 500
+    # Gate on a ~4 chars/token estimate so over-quota requests are rejected
+    # without a BPE pass; the exact count is only needed for usage recording
+    estimated_tokens = (len(full_prompt) >> 2) + 500
     
-    user_tier = await integration_service.get_user_tier(user_id)
     has_quota, quota_msg = usage_service.check_quota(
         db, user_id, user_tier, "llm_tokens", estimated_tokens
     )
     if not has_quota:
         raise HTTPException(status_code=429, detail=quota_msg)
     
-    # Generate response
-    system_prompt = "You are a patient, knowledgeable tutor helping students learn. Provide clear explanations, encourage critical thinking, and adapt to the student's level."
+    prompt_tokens = token_counter.count_tokens(full_prompt)
     
+    return TutorPrep(session_id=session_id, full_prompt=full_prompt, prompt_tokens=prompt_tokens)
+
+
+def record_educator_interaction(
+    db: Session,
+    session_id: UUID,
+    user_id: UUID,
+    message: EducatorChatMessage,
+    response_text: str,
+    tokens_used: int,
+    latency_ms: int,
+    provider_name: Optional[str],
+) -> None:
+    """Store the tutor turn and record its token usage."""
+    SessionService.store_prompt(
+        db, session_id, user_id, message.message, response_text, tokens_used, latency_ms
+    )
+    
+    usage_service.record_usage(
+        db, user_id, "llm_tokens", tokens_used,
+        metadata={
+            "educator_chat": True,
+            "lesson_id": str(message.lesson_id),
+            "session_id": str(session_id),
+            "provider": provider_name,
+        }
+    )
+
+
+@router.post("/chat/message", response_model=EducatorChatResponse)
+async def educator_chat(
+    message: EducatorChatMessage,
+    background_tasks: BackgroundTasks,
+    user_id: UUID = Depends(get_user_id),
+    db: Session = Depends(get_db),
+    service: ServiceTokenPayload = Depends(verify_service_token_dependency)
+):
+    """Chat with educator/tutor about a specific lesson."""
+    start_time = time.time()
+    
+    if not await llm_orchestrator.ensure_ready():
+        raise HTTPException(status_code=503, detail="LLM service not ready")
+    
+    prep = await prepare_educator_chat(db, message, user_id)
+    session_id = prep.session_id
+    
+    # Generate response
     try:
         provider_result = await llm_orchestrator.generate_response(
-            prompt=full_prompt,
-            system_prompt=system_prompt,
+            prompt=prep.full_prompt,
+            system_prompt=TUTOR_SYSTEM_PROMPT,
             temperature=0.7,
             max_tokens=1000,
         )
@@ -320,24 +399,19 @@ async def educator_chat(
         logger.error(f"All LLM providers exhausted: {exc}")
         raise HTTPException(status_code=503, detail="LLM providers unavailable")
     
-    tokens_used = token_counter.count_tokens(full_prompt + response_text)
+    tokens_used = prep.prompt_tokens + token_counter.count_tokens(response_text)
     latency_ms = int((time.time() - start_time) * 1000)
     
-    SessionService.store_prompt(
-        db, session_id, user_id, message.message, response_text, tokens_used, latency_ms
+    # Both writes share the request's Session, so they run together in one
+    # worker thread rather than concurrently
+    await run_in_threadpool(
+        record_educator_interaction,
+        db, session_id, user_id, message, response_text, tokens_used, latency_ms, provider_name
     )
     
-    usage_service.record_usage(
-        db, user_id, "llm_tokens", tokens_used,
-        metadata={
-            "educator_chat": True,
-            "lesson_id": str(message.lesson_id),
-            "session_id": str(session_id),
-            "provider": provider_name,
-        }
-    )
-    
-    await integration_service.store_stm_interaction(
+    # Store in STM once the response has been sent
+    background_tasks.add_task(
+        integration_service.store_stm_interaction,
         user_id=user_id,
         session_id=session_id,
         input_text=message.message,
@@ -362,3 +436,94 @@ async def educator_chat(
         tokens_used=tokens_used,
         latency_ms=latency_ms
     )
+
+
+@router.post("/chat/message/stream")
+async def educator_chat_stream(
+    message: EducatorChatMessage,
+    user_id: UUID = Depends(get_user_id),
+    db: Session = Depends(get_db),
+    service: ServiceTokenPayload = Depends(verify_service_token_dependency)
+):
+    """Chat with educator/tutor about a lesson, streaming the response as SSE."""
+    start_time = time.time()
+    
+    if not await llm_orchestrator.ensure_ready():
+        raise HTTPException(status_code=503, detail="LLM service not ready")
+    
+    prep = await prepare_educator_chat(db, message, user_id)
+    session_id = prep.session_id
+    
+    # Stored after the stream closes so the client never waits on writes
+    background = BackgroundTasks()
+    
+    async def generate():
+        """Generate streaming response."""
+        response_parts: List[str] = []
+        
+        try:
+            try:
+                provider_name, _provider_model, stream = await llm_orchestrator.generate_streaming_response(
+                    prompt=prep.full_prompt,
+                    system_prompt=TUTOR_SYSTEM_PROMPT,
+                    temperature=0.7,
+                    max_tokens=1000,
+                )
+            except ProviderExhaustedError as exc:
+                logger.error(f"All LLM providers exhausted: {exc}")
+                yield SSE_UNAVAILABLE_FRAME
+                return
+            
+            async for chunk in prefetch_stream(stream):
+                response_parts.append(chunk)
+                yield sse_content_frame(chunk)
+            response_text = "".join(response_parts)
+            
+            tokens_used = prep.prompt_tokens + token_counter.count_tokens(response_text)
+            latency_ms = int((time.time() - start_time) * 1000)
+            
+            background.add_task(
+                record_educator_interaction,
+                db, session_id, user_id, message, response_text, tokens_used, latency_ms, provider_name
+            )
+            background.add_task(
+                integration_service.store_stm_interaction,
+                user_id=user_id,
+                session_id=session_id,
+                input_text=message.message,
+                output_text=response_text,
+                tokens=tokens_used
+            )
+            
+            yield sse_frame({
+                "content": "",
+                "done": True,
+                "session_id": str(session_id),
+                "lesson_id": str(message.lesson_id),
+                "tokens_used": tokens_used,
+                "latency_ms": latency_ms
+            })
+            
+            logger.info(
+                "Educator chat stream completed",
+                extra={
+                    "user_id": str(user_id),
+                    "lesson_id": str(message.lesson_id),
+                    "session_id": str(session_id),
+                    "tokens_used": tokens_used,
+                }
+            )
+            
+        except Exception as e:
+            logger.error(f"Educator streaming error: {e}", exc_info=True)
+            yield SSE_ERROR_FRAME
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        background=background,
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -3,16 +3,20 @@ from __future__ import annotations
 
 import json
 import logging
+import random
+import time
 from typing import Any, Dict
-from uuid import uuid4
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from app.services.llm_router import llm_orchestrator, ProviderExhaustedError, ProviderError
+from app.utils.jsonfence import strip_fence
+from app.utils.responses import FastJSONResponse
 from app.utils.service_auth import verify_service_token_dependency, ServiceTokenPayload
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/quiz", tags=["quiz"])
+router = APIRouter(prefix="/quiz", default_response_class=FastJSONResponse, tags=["quiz"])
 
 DEFAULT_SYSTEM_PROMPT = (
     "You are Nova Intelligence, responsible for generating structured study quizzes "
@@ -54,16 +58,17 @@ def _parse_quiz_payload(raw_text: str) -> Dict[str, Any]:
 
 
 def _coerce_json(raw_text: str) -> Dict[str, Any]:
-    candidate = raw_text.strip()
-    if candidate.startswith("```"):
-        candidate = candidate.strip("`")
-        if candidate.lower().startswith("json"):
-            candidate = candidate[4:].lstrip()
-    return json.loads(candidate)
+    return json.loads(strip_fence(raw_text))
 
 
 def _generate_quiz_id() -> str:
-    return f"intelligence-{uuid4()}"
+    # UUIDv7 layout: millisecond timestamp first so ids sort by creation time.
+    # The id isn't a secret, so the random bits come from `random` rather
+    # than an os.urandom syscall (`random` is reseeded in forked workers).
+    value = (time.time_ns() // 1_000_000) << 80 | random.getrandbits(80)
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return f"intelligence-{UUID(int=value)}"
 
 
 @router.post("/generate", status_code=status.HTTP_200_OK)
@@ -1,20 +1,35 @@
 """Integration service for Memory and Reflection services."""
+import asyncio
 import httpx
 import logging
-from typing import Dict, Any, Optional, List
+import time
+from typing import Dict, Any, Optional, List, Tuple
 from uuid import UUID
 from datetime import datetime, timedelta
 from celery import Celery
 
-from app.config import settings
+from app.config import get_settings
 from app.utils.service_auth import generate_service_token
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
-# Cache for user tier info (to avoid hitting auth service on every request)
-_user_tier_cache = {}
+# Cache for user tier info (to avoid hitting auth service on every request):
+# user_id -> (fetched_at on the monotonic clock, tier)
+_user_tier_cache: Dict[str, Tuple[float, str]] = {}
 _cache_ttl_seconds = 300  # 5 minutes
+_user_tier_cache_max = 10_000
+# Auth lookups in progress, so concurrent misses for a user share one request
+_user_tier_inflight: Dict[str, "asyncio.Task[str]"] = {}
+
+# Short-lived cache of memory context, so repeated lookups within a turn don't
+# each go to the Memory service: (user_id, session_id) -> (fetched_at, limit, context)
+_memory_context_cache: Dict[Tuple[str, Optional[str]], Tuple[float, int, Dict[str, Any]]] = {}
+_memory_context_ttl_seconds = 5.0
+_memory_context_cache_max = 4096
+# Memory lookups in progress, keyed by (user_id, session_id, limit)
+_memory_context_inflight: Dict[Tuple[str, Optional[str], int], "asyncio.Task[Dict[str, Any]]"] = {}
 
 # Cache for service token reuse across outbound calls
 _service_token_cache = {
@@ -23,11 +38,35 @@ _service_token_cache = {
 }
 _service_token_refresh_margin = timedelta(minutes=10)
 
+# Shared client so outbound calls reuse pooled keep-alive connections
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=5.0,
+            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+        )
+    return _http_client
+
+
 # Initialize Celery for reflection tasks
 celery_app = None
+# How long a publish may wait for a pooled producer before giving up
+_reflection_publish_timeout_seconds = 2.0
 if settings.enable_reflection:
     try:
         celery_app = Celery(broker=settings.celery_broker_url)
+        # Publish-only client: nothing reads task results here, and the
+        # producer connection is pooled rather than reopened per send
+        celery_app.conf.update(
+            task_ignore_result=True,
+            broker_pool_limit=10,
+            broker_connection_retry_on_startup=True,
+        )
         logger.info("Celery initialized for reflection tasks")
     except Exception as e:
         logger.error(f"Failed to initialize Celery: {e}")
@@ -37,6 +76,14 @@ if settings.enable_reflection:
 class IntegrationService:
     """Service for integrating with Memory and Reflection services."""
     
+    @staticmethod
+    async def close() -> None:
+        """Close the shared HTTP client (called on application shutdown)."""
+        global _http_client
+        if _http_client is not None:
+            await _http_client.aclose()
+            _http_client = None
+
     @staticmethod
     def _get_service_token() -> Optional[str]:
         """Return a cached service token, refreshing it when close to expiry."""
@@ -84,40 +131,46 @@ class IntegrationService:
         Returns:
             Subscription tier (free_trial, basic, or pro)
         """
-        from datetime import datetime
-        
         # Check cache first
         cache_key = str(user_id)
-        if cache_key in _user_tier_cache:
-            cached_data = _user_tier_cache[cache_key]
-            # Check if cache is still valid
-            age = (datetime.utcnow() - cached_data["timestamp"]).total_seconds()
-            if age < _cache_ttl_seconds:
-                return cached_data["tier"]
+        cached = _user_tier_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < _cache_ttl_seconds:
+            return cached[1]
         
+        task = _user_tier_inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(IntegrationService._fetch_user_tier(cache_key))
+            _user_tier_inflight[cache_key] = task
+            task.add_done_callback(lambda _task: _user_tier_inflight.pop(cache_key, None))
+        # Shielded so one cancelled caller doesn't fail the others
+        return await asyncio.shield(task)
+    
+    @staticmethod
+    async def _fetch_user_tier(cache_key: str) -> str:
+        """Fetch a user's tier from the Auth service and cache it."""
         try:
             # Fetch from auth service
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(
-                    f"{settings.auth_service_url}/auth/me",
-                    headers=IntegrationService._build_headers({"X-User-Id": str(user_id)})
-                )
+            client = _get_http_client()
+            response = await client.get(
+                f"{settings.auth_service_url}/auth/me",
+                headers=IntegrationService._build_headers({"X-User-Id": cache_key})
+            )
+            
+            if response.status_code == 200:
+                user_data = response.json()
+                tier = user_data.get("subscription_tier", "free_trial")
+                
+                # Cache the result, dropping the oldest entry when full
+                _user_tier_cache.pop(cache_key, None)
+                if len(_user_tier_cache) >= _user_tier_cache_max:
+                    _user_tier_cache.pop(next(iter(_user_tier_cache)))
+                _user_tier_cache[cache_key] = (time.monotonic(), tier)
+                
+                return tier
+            else:
+                logger.warning(f"Failed to fetch user tier: {response.status_code}")
+                return "free_trial"  # Default to free tier on error
                 
-                if response.status_code == 200:
-                    user_data = response.json()
-                    tier = user_data.get("subscription_tier", "free_trial")
-                    
-                    # Cache the result
-                    _user_tier_cache[cache_key] = {
-                        "tier": tier,
-                        "timestamp": datetime.utcnow()
-                    }
-                    
-                    return tier
-                else:
-                    logger.warning(f"Failed to fetch user tier: {response.status_code}")
-                    return "free_trial"  # Default to free tier on error
-                    
         except Exception as e:
             logger.error(f"Failed to get user tier: {e}")
             return "free_trial"  # Default to free tier on error
@@ -139,24 +192,62 @@ class IntegrationService:
         Returns:
             Dictionary with stm, itm, and ltm context
         """
+        cache_key = (str(user_id), str(session_id) if session_id else None)
+        cached = _memory_context_cache.get(cache_key)
+        if (
+            cached
+            and cached[1] == limit
+            and time.monotonic() - cached[0] < _memory_context_ttl_seconds
+        ):
+            return cached[2]
+        
+        inflight_key = (*cache_key, limit)
+        task = _memory_context_inflight.get(inflight_key)
+        if task is None:
+            task = asyncio.create_task(IntegrationService._fetch_memory_context(cache_key, limit))
+            _memory_context_inflight[inflight_key] = task
+            task.add_done_callback(lambda _task: _memory_context_inflight.pop(inflight_key, None))
+        # Shielded so one cancelled caller doesn't fail the others
+        return await asyncio.shield(task)
+    
+    @staticmethod
+    async def _fetch_memory_context(
+        cache_key: Tuple[str, Optional[str]], limit: int
+    ) -> Dict[str, Any]:
+        """Fetch memory context from the Memory service and cache it."""
+        user_key, session_key = cache_key
         try:
             params = {"limit": limit}
-            if session_id:
-                params["session_id"] = str(session_id)
+            if session_key:
+                params["session_id"] = session_key
             
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(
-                    f"{settings.memory_service_url}/memory/context",
-                    params=params,
-                    headers=IntegrationService._build_headers({"X-User-Id": str(user_id)})
-                )
+            client = _get_http_client()
+            response = await client.get(
+                f"{settings.memory_service_url}/memory/context",
+                params=params,
+                headers=IntegrationService._build_headers({"X-User-Id": user_key})
+            )
+            
+            if response.status_code == 200:
+                payload = response.json()
+                # Keep only well-formed entries per tier, so prompt building
+                # doesn't have to re-check them on every turn
+                context = {
+                    tier: [memory for memory in payload.get(tier) or () if isinstance(memory, dict)]
+                    for tier in ("stm", "itm", "ltm")
+                }
+                
+                # Cache the result, dropping the oldest entry when full
+                _memory_context_cache.pop(cache_key, None)
+                if len(_memory_context_cache) >= _memory_context_cache_max:
+                    _memory_context_cache.pop(next(iter(_memory_context_cache)))
+                _memory_context_cache[cache_key] = (time.monotonic(), limit, context)
+                
+                return context
+            else:
+                logger.warning(f"Memory service returned {response.status_code}")
+                return {"stm": [], "itm": [], "ltm": []}
                 
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.warning(f"Memory service returned {response.status_code}")
-                    return {"stm": [], "itm": [], "ltm": []}
-                    
         except Exception as e:
             logger.error(f"Failed to get memory context: {e}")
             return {"stm": [], "itm": [], "ltm": []}
@@ -167,44 +258,43 @@ class IntegrationService:
         Build a context prompt from memory data.
         
         Args:
-            memory_context: Dictionary with stm, itm, ltm
+            memory_context: Dictionary with stm, itm, ltm lists of dicts,
+                as returned by get_memory_context
             
         Returns:
             Formatted context string
         """
-        context_parts = []
+        sections = []
         
-        # Add LTM context (high-confidence permanent knowledge)
-        ltm = memory_context.get("ltm", [])
+        # LTM context (high-confidence permanent knowledge): top 3
+        ltm = memory_context.get("ltm")
         if ltm:
-            context_parts.append("# Relevant Knowledge:")
-            for memory in ltm[:3]:  # Top 3 LTM
-                if isinstance(memory, dict):
-                    context_parts.append(f"- {memory.get('input', '')[:150]}")
+            sections.append("# Relevant Knowledge:" + "".join(
+                f"\n- {memory.get('input', '')[:150]}" for memory in ltm[:3]
+            ))
         
-        # Add ITM context (frequently accessed recent memories)
-        itm = memory_context.get("itm", [])
+        # ITM context (frequently accessed recent memories): top 2
+        itm = memory_context.get("itm")
         if itm:
-            context_parts.append("\n# Recent Patterns:")
-            for memory in itm[:2]:  # Top 2 ITM
-                if isinstance(memory, dict):
-                    context_parts.append(f"- {memory.get('input', '')[:150]}")
+            sections.append("# Recent Patterns:" + "".join(
+                f"\n- {memory.get('input', '')[:150]}" for memory in itm[:2]
+            ))
         
-        # Add STM context (conversation history)
-        stm = memory_context.get("stm", [])
+        # STM context (conversation history): last 3
+        stm = memory_context.get("stm")
         if stm:
-            context_parts.append("\n# Recent Conversation:")
-            for interaction in stm[-3:]:  # Last 3 STM
-                if isinstance(interaction, dict):
-                    inp = interaction.get("input", "")
-                    out = interaction.get("output", "")
-                    if inp:
-                        context_parts.append(f"User: {inp[:100]}")
-                    if out:
-                        context_parts.append(f"Assistant: {out[:100]}")
+            lines = ["# Recent Conversation:"]
+            for interaction in stm[-3:]:
+                inp = interaction.get("input")
+                out = interaction.get("output")
+                if inp:
+                    lines.append(f"User: {inp[:100]}")
+                if out:
+                    lines.append(f"Assistant: {out[:100]}")
+            sections.append("\n".join(lines))
         
-        if context_parts:
-            return "\n".join(context_parts) + "\n\n"
+        if sections:
+            return "\n\n".join(sections) + "\n\n"
         return ""
     
     @staticmethod
@@ -231,21 +321,26 @@ class IntegrationService:
         try:
             from datetime import datetime
             
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.post(
-                    f"{settings.memory_service_url}/memory/stm/store",
-                    params={"session_id": str(session_id)},
-                    headers=IntegrationService._build_headers({"X-User-Id": str(user_id)}),
-                    json={
-                        "input": input_text,
-                        "output": output_text,
-                        "timestamp": datetime.utcnow().isoformat(),
-                        "tokens": tokens
-                    }
-                )
-                
-                return response.status_code == 200
-                
+            client = _get_http_client()
+            response = await client.post(
+                f"{settings.memory_service_url}/memory/stm/store",
+                params={"session_id": str(session_id)},
+                headers=IntegrationService._build_headers({"X-User-Id": str(user_id)}),
+                json={
+                    "input": input_text,
+                    "output": output_text,
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "tokens": tokens
+                }
+            )
+            
+            if response.status_code != 200:
+                return False
+            
+            # The session's cached context no longer includes this turn
+            _memory_context_cache.pop((str(user_id), str(session_id)), None)
+            return True
+            
         except Exception as e:
             logger.error(f"Failed to store STM interaction: {e}")
             return False
@@ -261,6 +356,9 @@ class IntegrationService:
         """
         Trigger asynchronous reflection task.
         
+        Publishing blocks on the broker, so call this from a worker thread
+        (BackgroundTasks or run_in_threadpool), not on the event loop.
+        
         Args:
             user_id: User ID
             session_id: Session ID
@@ -276,17 +374,23 @@ class IntegrationService:
             return False
         
         try:
-            # Enqueue reflection task
-            celery_app.send_task(
-                "reflect_on_interaction",
-                args=[
-                    str(user_id),
-                    str(session_id),
-                    input_text,
-                    output_text,
-                    context
-                ]
-            )
+            # Enqueue reflection task; an exhausted producer pool fails the
+            # publish after a short wait instead of blocking indefinitely
+            with celery_app.producer_pool.acquire(
+                block=True, timeout=_reflection_publish_timeout_seconds
+            ) as producer:
+                celery_app.send_task(
+                    "reflect_on_interaction",
+                    args=[
+                        str(user_id),
+                        str(session_id),
+                        input_text,
+                        output_text,
+                        context
+                    ],
+                    ignore_result=True,
+                    producer=producer,
+                )
             logger.info(f"Reflection task queued for session {session_id}")
             return True
             
@@ -7,7 +7,7 @@ import time
 from dataclasses import dataclass
 from typing import AsyncGenerator, Callable, Dict, Iterable, Optional, Tuple
 
-from app.config import settings
+from app.config import get_settings
 from app.services.providers.base import (
     BaseLLMProvider,
     ProviderError,
@@ -23,12 +23,14 @@ from app.utils.metrics import (
     record_provider_success,
 )
 
+settings = get_settings()
+
 
 class ProviderExhaustedError(ProviderError):
     """Raised when no provider could satisfy a request."""
 
 
-@dataclass
+@dataclass(slots=True)
 class ProviderState:
     """Runtime state tracking for a provider instance."""
 
@@ -85,6 +87,13 @@ class ProviderOrchestrator:
         self._lock = asyncio.Lock()
         self._provider_states: Dict[str, ProviderState] = {}
         self._providers_in_priority: Tuple[str, ...] = ()
+        # Provider states in priority order, overall and streaming-capable;
+        # enablement and configuration are fixed once providers are configured
+        self._available_states: Tuple[ProviderState, ...] = ()
+        self._streaming_states: Tuple[ProviderState, ...] = ()
+        # Refreshed by the readiness probe so requests skip the provider walk
+        self._ready = False
+        self._readiness_task: Optional[asyncio.Task] = None
 
         self.provider_factories = provider_factories or {
             "ollama": lambda: LocalOllamaProvider(self.settings),
@@ -121,6 +130,10 @@ class ProviderOrchestrator:
 
         self._provider_states = providers
         self._providers_in_priority = tuple(ordered_keys)
+        self._available_states = tuple(providers[key] for key in ordered_keys)
+        self._streaming_states = tuple(
+            state for state in self._available_states if state.provider.supports_streaming
+        )
         if not self._providers_in_priority:
             self.logger.warning("No LLM providers configured; chat responses will fallback")
 
@@ -153,6 +166,11 @@ class ProviderOrchestrator:
 
     # ------------------------------------------------------------------
     async def ensure_ready(self) -> bool:
+        if self._ready:
+            return True
+        return await self._probe_ready()
+
+    async def _probe_ready(self) -> bool:
         for key in self._providers_in_priority:
             state = self._provider_states[key]
             provider = state.provider
@@ -160,6 +178,7 @@ class ProviderOrchestrator:
                 if await provider.ensure_ready():
                     state.reset_failures()
                     record_provider_success(provider.name)
+                    self._ready = True
                     return True
             except Exception as exc:  # pylint: disable=broad-except
                 state.register_failure(
@@ -169,23 +188,49 @@ class ProviderOrchestrator:
                     self.settings.llm_provider_retry_limit,
                 )
                 record_provider_failure(provider.name, "not_ready")
+        self._ready = False
         return False
 
+    def start_readiness_probe(self) -> None:
+        if self._readiness_task is None or self._readiness_task.done():
+            self._readiness_task = asyncio.create_task(self._run_readiness_probe())
+
+    async def stop_readiness_probe(self) -> None:
+        task, self._readiness_task = self._readiness_task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def shutdown(self) -> None:
+        for state in self._provider_states.values():
+            try:
+                await state.provider.shutdown()
+            except Exception as exc:  # pylint: disable=broad-except
+                self.logger.warning(
+                    "Provider shutdown failed",
+                    extra={"provider": state.provider.name, "error": str(exc)},
+                )
+
+    async def _run_readiness_probe(self) -> None:
+        interval = self.settings.llm_readiness_probe_sec
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._probe_ready()
+            except Exception as exc:  # pylint: disable=broad-except
+                self.logger.warning("Readiness probe failed", extra={"error": str(exc)})
+
     # ------------------------------------------------------------------
     def _iter_available_states(self, require_streaming: bool = False) -> Iterable[ProviderState]:
+        states = self._streaming_states if require_streaming else self._available_states
         current = time.time()
-        for key in self._providers_in_priority:
-            state = self._provider_states.get(key)
-            if not state:
-                continue
-            provider = state.provider
-            if not (provider.is_enabled() and provider.is_configured()):
-                continue
-            if require_streaming and not provider.supports_streaming:
-                continue
-            if state.is_in_cooldown(current):
-                continue
-            yield state
+        for state in states:
+            if not state.is_in_cooldown(current):
+                yield state
 
     # ------------------------------------------------------------------
     async def generate_response(
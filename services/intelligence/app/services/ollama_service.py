@@ -1,12 +1,14 @@
 """Ollama LLM integration service."""
 import asyncio
 import httpx
+import json
 import logging
 from typing import AsyncGenerator, Optional, Dict, Any
 
-from app.config import settings
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 class OllamaService:
@@ -145,7 +147,6 @@ class OllamaService:
                     async for chunk in response.aiter_lines():
                         if chunk:
                             try:
-                                import json
                                 data = json.loads(chunk)
                                 if "response" in data:
                                     yield data["response"]
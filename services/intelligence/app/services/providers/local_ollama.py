@@ -3,7 +3,8 @@ from __future__ import annotations
 
 import asyncio
 import json
-from typing import AsyncGenerator, Optional
+import time
+from typing import AsyncGenerator, FrozenSet, Optional, Tuple
 
 import httpx
 
@@ -21,15 +22,39 @@ class LocalOllamaProvider(BaseLLMProvider):
     name = "ollama"
     supports_streaming = True
     default_timeout_seconds = 120.0
+    # How long one /api/tags listing serves the health and model checks
+    tags_ttl_seconds = 30.0
 
     def __init__(self, settings) -> None:
         super().__init__(settings)
         self.base_url = settings.ollama_url.rstrip("/")
         self._model = settings.llm_model
+        self._model_prefix = self._model.split(":", 1)[0]
         self._gpu_enabled = settings.gpu_enabled
         self._model_loaded = False
         self._gpu_available = False
         self._init_lock = asyncio.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tags_cache: Optional[Tuple[float, FrozenSet[str]]] = None
+
+    # --- Lifecycle -------------------------------------------------
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled client, creating it on first use.
+
+        Requests pass their own timeout, so one keep-alive pool serves the
+        health, pull and generate calls.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.get_timeout_seconds(), connect=2.0),
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            )
+        return self._client
+
+    async def shutdown(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
 
     # --- Metadata --------------------------------------------------
     @property
@@ -41,30 +66,40 @@ class LocalOllamaProvider(BaseLLMProvider):
         return bool(self.base_url)
 
     # --- Health ----------------------------------------------------
-    async def check_health(self) -> bool:
+    async def _get_tags(self) -> Optional[FrozenSet[str]]:
+        """Return the installed model names without their tags, or None if
+        Ollama can't be reached.
+
+        Successful listings are reused for tags_ttl_seconds.
+        """
+        cached = self._tags_cache
+        if cached is not None and time.monotonic() - cached[0] < self.tags_ttl_seconds:
+            return cached[1]
+
         try:
-            async with httpx.AsyncClient(timeout=self.get_timeout_seconds()) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                return response.status_code == 200
+            response = await self._get_client().get(f"{self.base_url}/api/tags")
+            if response.status_code != 200:
+                return None
+            installed = frozenset(
+                model.get("name", "").split(":", 1)[0]
+                for model in response.json().get("models", [])
+            )
         except Exception as exc:  # pylint: disable=broad-except
-            self.logger.error("Ollama health check failed", exc_info=exc)
-            return False
+            self.logger.error("Ollama tags request failed", exc_info=exc)
+            return None
+
+        self._tags_cache = (time.monotonic(), installed)
+        return installed
+
+    async def check_health(self) -> bool:
+        return await self._get_tags() is not None
 
     async def check_model_loaded(self) -> bool:
-        try:
-            async with httpx.AsyncClient(timeout=self.get_timeout_seconds()) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                if response.status_code == 200:
-                    data = response.json()
-                    models = data.get("models", [])
-                    prefix = self._model.split(":")[0]
-                    self._model_loaded = any(
-                        model.get("name", "").startswith(prefix) for model in models
-                    )
-                    return self._model_loaded
-        except Exception as exc:  # pylint: disable=broad-except
-            self.logger.error("Model check failed", exc_info=exc)
-        return False
+        installed = await self._get_tags()
+        if installed is None:
+            return False
+        self._model_loaded = self._model_prefix in installed
+        return self._model_loaded
 
     async def detect_gpu(self) -> bool:
         self._gpu_available = self._gpu_enabled
@@ -72,14 +107,15 @@ class LocalOllamaProvider(BaseLLMProvider):
 
     async def pull_model(self) -> bool:
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/pull",
-                    json={"name": self._model, "stream": False},
-                )
-                if response.status_code == 200:
-                    self._model_loaded = True
-                    return True
+            response = await self._get_client().post(
+                f"{self.base_url}/api/pull",
+                json={"name": self._model, "stream": False},
+                timeout=300.0,
+            )
+            if response.status_code == 200:
+                self._model_loaded = True
+                self._tags_cache = None
+                return True
         except Exception as exc:  # pylint: disable=broad-except
             self.logger.error("Model pull failed", exc_info=exc)
         return False
@@ -134,8 +170,9 @@ class LocalOllamaProvider(BaseLLMProvider):
 
         timeout = self.get_timeout_seconds()
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.post(f"{self.base_url}/api/generate", json=payload)
+            response = await self._get_client().post(
+                f"{self.base_url}/api/generate", json=payload, timeout=timeout
+            )
         except httpx.ReadTimeout as exc:
             raise ProviderTimeoutError("Ollama generate timed out") from exc
         except Exception as exc:  # pylint: disable=broad-except
@@ -178,35 +215,35 @@ class LocalOllamaProvider(BaseLLMProvider):
 
         async def _stream() -> AsyncGenerator[str, None]:
             try:
-                async with httpx.AsyncClient(timeout=timeout) as client:
-                    async with client.stream(
-                        "POST",
-                        f"{self.base_url}/api/generate",
-                        json=payload,
-                    ) as response:
-                        if response.status_code != 200:
-                            text = await response.aread()
-                            self.logger.error(
-                                "Ollama streaming error",
-                                status_code=response.status_code,
-                                body=text.decode(errors="ignore")[:500],
-                            )
-                            raise ProviderError(
-                                f"Streaming failed with {response.status_code}"
-                            )
-
-                        async for line in response.aiter_lines():
-                            if not line:
-                                continue
-                            try:
-                                data = json.loads(line)
-                            except json.JSONDecodeError:
-                                continue
-                            chunk = data.get("response")
-                            if chunk:
-                                yield chunk
-                            if data.get("done"):
-                                break
+                async with self._get_client().stream(
+                    "POST",
+                    f"{self.base_url}/api/generate",
+                    json=payload,
+                    timeout=timeout,
+                ) as response:
+                    if response.status_code != 200:
+                        text = await response.aread()
+                        self.logger.error(
+                            "Ollama streaming error",
+                            status_code=response.status_code,
+                            body=text.decode(errors="ignore")[:500],
+                        )
+                        raise ProviderError(
+                            f"Streaming failed with {response.status_code}"
+                        )
+
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        try:
+                            data = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        chunk = data.get("response")
+                        if chunk:
+                            yield chunk
+                        if data.get("done"):
+                            break
             except httpx.ReadTimeout as exc:
                 raise ProviderTimeoutError("Ollama streaming timed out") from exc
             except Exception as exc:  # pylint: disable=broad-except
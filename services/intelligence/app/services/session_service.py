@@ -2,12 +2,20 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from uuid import UUID, uuid4
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Recent-history cache for the chat prompt fallback: session_id ->
+# (fetched_at, limit, prompts). store_prompt drops the entry for its session;
+# the TTL bounds staleness for prompts written by other workers.
+_recent_history_cache: Dict[str, Tuple[float, int, List[Dict[str, Any]]]] = {}
+_recent_history_ttl_seconds = 30
+_recent_history_cache_max = 10_000
+
 
 class SessionService:
     """Service for managing chat sessions and prompts."""
@@ -80,16 +88,76 @@ class SessionService:
         return sessions
     
     @staticmethod
-    def end_session(db: Session, session_id: UUID) -> bool:
-        """Mark a session as completed."""
+    def get_session_with_history(
+        db: Session, session_id: UUID, limit: int = 100
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get a session and its conversation history in one query.
+
+        Returns the get_session() fields plus "prompts" (oldest first),
+        or None if the session does not exist.
+        """
         query = text("""
+            SELECT s.id, s.user_id, s.status, s.model_name, s.created_at, s.ended_at,
+                   p.id, p.session_id, p.user_id, p.input_text, p.output_text,
+                   p.tokens_used, p.latency_ms, p.created_at
+            FROM sessions s
+            LEFT JOIN prompts p ON p.session_id = s.id
+            WHERE s.id = :session_id
+            ORDER BY p.created_at ASC
+            LIMIT :limit
+        """)
+        rows = db.execute(query, {"session_id": str(session_id), "limit": limit}).fetchall()
+        if not rows:
+            return None
+
+        first = rows[0]
+        session = {
+            "id": first[0],
+            "user_id": first[1],
+            "status": first[2],
+            "model_name": first[3],
+            "created_at": first[4],
+            "ended_at": first[5],
+            "prompts": [],
+        }
+        for row in rows:
+            if row[6] is None:  # session without prompts
+                continue
+            session["prompts"].append({
+                "id": row[6],
+                "session_id": row[7],
+                "user_id": row[8],
+                "input_text": row[9],
+                "output_text": row[10],
+                "tokens_used": row[11],
+                "latency_ms": row[12],
+                "created_at": row[13]
+            })
+        return session
+    
+    @staticmethod
+    def end_session(db: Session, session_id: UUID, user_id: Optional[UUID] = None) -> bool:
+        """
+        Mark a session as completed.
+
+        If user_id is given, only that user's session is updated. Returns
+        False when no session was updated.
+        """
+        params = {"session_id": str(session_id)}
+        owner_clause = ""
+        if user_id is not None:
+            owner_clause = " AND user_id = :user_id"
+            params["user_id"] = str(user_id)
+        query = text(f"""
             UPDATE sessions
             SET status = 'completed', ended_at = NOW()
-            WHERE id = :session_id
+            WHERE id = :session_id{owner_clause}
+            RETURNING id
         """)
-        db.execute(query, {"session_id": str(session_id)})
+        updated = db.execute(query, params).fetchone() is not None
         db.commit()
-        return True
+        return updated
     
     @staticmethod
     def store_prompt(
@@ -121,6 +189,7 @@ class SessionService:
             }
         )
         db.commit()
+        _recent_history_cache.pop(str(session_id), None)
         return prompt_id
     
     @staticmethod
@@ -149,6 +218,35 @@ class SessionService:
             })
         return prompts
     
+    @staticmethod
+    def get_recent_history(db: Session, session_id: UUID, limit: int = 5) -> List[Dict[str, Any]]:
+        """Get the latest `limit` prompts for a session, oldest first (cached briefly)."""
+        cache_key = str(session_id)
+        cached = _recent_history_cache.get(cache_key)
+        if cached:
+            fetched_at, fetched_limit, prompts = cached
+            if fetched_limit >= limit and time.monotonic() - fetched_at < _recent_history_ttl_seconds:
+                return prompts[-limit:]
+
+        query = text("""
+            SELECT input_text, output_text, created_at
+            FROM prompts
+            WHERE session_id = :session_id
+            ORDER BY created_at DESC
+            LIMIT :limit
+        """)
+        result = db.execute(query, {"session_id": cache_key, "limit": limit})
+        prompts = [
+            {"input_text": row[0], "output_text": row[1], "created_at": row[2]}
+            for row in result
+        ]
+        prompts.reverse()
+
+        if len(_recent_history_cache) >= _recent_history_cache_max:
+            _recent_history_cache.clear()
+        _recent_history_cache[cache_key] = (time.monotonic(), limit, prompts)
+        return prompts
+    
     @staticmethod
     def get_user_token_usage_today(db: Session, user_id: UUID) -> int:
         """
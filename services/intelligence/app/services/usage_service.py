@@ -6,15 +6,45 @@ Handles usage_ledger table operations for billing and quota management.
 import logging
 import json
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 from uuid import UUID
 
 from app.utils.sanitize import sanitize_metadata
 
 logger = logging.getLogger(__name__)
 
+# Daily limits per subscription tier; -1 means unlimited
+TIER_LIMITS = {
+    'free_trial': {
+        'llm_tokens': 1000,
+        'messages': 100
+    },
+    'basic': {
+        'llm_tokens': 50000,
+        'messages': 5000
+    },
+    'pro': {
+        'llm_tokens': -1,  # Unlimited
+        'messages': -1     # Unlimited
+    }
+}
+
+_INSERT_USAGE = text("""
+    INSERT INTO usage_ledger (user_id, resource_type, amount, metadata, timestamp)
+    VALUES (:user_id, :resource_type, :amount, :metadata, :timestamp)
+""")
+
+_TODAY_USAGE_BY_TYPE = text("""
+    SELECT resource_type, COALESCE(SUM(amount), 0) as total
+    FROM usage_ledger
+    WHERE user_id = :user_id
+      AND resource_type IN :resource_types
+      AND timestamp >= :today_start
+    GROUP BY resource_type
+""").bindparams(bindparam("resource_types", expanding=True))
+
 
 class UsageService:
     """Service for managing usage tracking and quota enforcement."""
@@ -49,13 +79,8 @@ class UsageService:
             else:
                 metadata_payload = None
 
-            query = text("""
-                INSERT INTO usage_ledger (user_id, resource_type, amount, metadata, timestamp)
-                VALUES (:user_id, :resource_type, :amount, :metadata, :timestamp)
-            """)
-            
             db.execute(
-                query,
+                _INSERT_USAGE,
                 {
                     "user_id": str(user_id),
                     "resource_type": resource_type,
@@ -82,6 +107,62 @@ class UsageService:
             db.rollback()
             return False
     
+    @staticmethod
+    def record_usage_batch(
+        db: Session,
+        user_id: UUID,
+        entries: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        Record several usage_ledger rows in one statement and one commit.
+        
+        Args:
+            db: Database session
+            user_id: User UUID
+            entries: Dicts with 'resource_type', 'amount' and optional 'metadata'
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not entries:
+            return True
+        
+        try:
+            timestamp = datetime.utcnow()
+            rows = []
+            for entry in entries:
+                metadata = entry.get("metadata")
+                rows.append({
+                    "user_id": str(user_id),
+                    "resource_type": entry["resource_type"],
+                    "amount": entry["amount"],
+                    # Ensure metadata is safe and JSON serializable
+                    "metadata": json.dumps(sanitize_metadata(metadata)) if metadata is not None else None,
+                    "timestamp": timestamp
+                })
+            
+            # A list of parameter sets runs as one executemany (batched INSERT)
+            db.execute(_INSERT_USAGE, rows)
+            db.commit()
+            
+            logger.info(
+                f"Recorded usage: user={user_id}, "
+                + ", ".join(f"{row['resource_type']}={row['amount']}" for row in rows)
+            )
+            return True
+            
+        except Exception as e:
+            logger.error(
+                "Failed to record usage",
+                extra={
+                    "error": str(e),
+                    "user_id": str(user_id),
+                    "resource_types": [entry.get("resource_type") for entry in entries],
+                },
+            )
+            db.rollback()
+            return False
+    
     @staticmethod
     def get_today_usage(
         db: Session,
@@ -126,6 +207,46 @@ class UsageService:
             logger.error(f"Failed to get today's usage: {e}")
             return 0
     
+    @staticmethod
+    def get_today_usage_by_type(
+        db: Session,
+        user_id: UUID,
+        resource_types: List[str]
+    ) -> Dict[str, int]:
+        """
+        Get today's (UTC) usage for several resource types in one query.
+        
+        Args:
+            db: Database session
+            user_id: User UUID
+            resource_types: Resource types to total
+            
+        Returns:
+            Usage amount for today keyed by resource type (0 if none)
+        """
+        usage = {resource_type: 0 for resource_type in resource_types}
+        if not usage:
+            return usage
+        
+        try:
+            today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            
+            result = db.execute(
+                _TODAY_USAGE_BY_TYPE,
+                {
+                    "user_id": str(user_id),
+                    "resource_types": list(usage),
+                    "today_start": today_start
+                }
+            )
+            for resource_type, total in result:
+                usage[resource_type] = int(total)
+            
+        except Exception as e:
+            logger.error(f"Failed to get today's usage: {e}")
+        
+        return usage
+    
     @staticmethod
     def check_quota(
         db: Session,
@@ -147,38 +268,57 @@ class UsageService:
         Returns:
             Tuple of (has_quota: bool, message: str)
         """
-        # Define tier limits
-        TIER_LIMITS = {
-            'free_trial': {
-                'llm_tokens': 1000,
-                'messages': 100
-            },
-            'basic': {
-                'llm_tokens': 50000,
-                'messages': 5000
-            },
-            'pro': {
-                'llm_tokens': -1,  # Unlimited
-                'messages': -1     # Unlimited
-            }
-        }
-        
-        # Get limit for this tier and resource type
-        limit = TIER_LIMITS.get(tier, {}).get(resource_type, 0)
+        return UsageService.check_quotas(
+            db, user_id, tier, [(resource_type, requested_amount)]
+        )[0]
+    
+    @staticmethod
+    def check_quotas(
+        db: Session,
+        user_id: UUID,
+        tier: str,
+        requests: List[Tuple[str, int]]
+    ) -> List[Tuple[bool, str]]:
+        """
+        Check several resource quotas with a single usage query.
         
-        # Pro tier has unlimited quota
-        if limit == -1:
-            return True, "Unlimited quota"
+        Args:
+            db: Database session
+            user_id: User UUID
+            tier: Subscription tier ('free_trial', 'basic', 'pro')
+            requests: (resource_type, requested_amount) pairs
+            
+        Returns:
+            One (has_quota: bool, message: str) tuple per request, in order
+        """
+        tier_limits = TIER_LIMITS.get(tier, {})
+        limits = [tier_limits.get(resource_type, 0) for resource_type, _ in requests]
         
-        # Get current usage
-        current_usage = UsageService.get_today_usage(db, user_id, resource_type)
+        # Unlimited resources don't need their usage looked up
+        usage = UsageService.get_today_usage_by_type(
+            db,
+            user_id,
+            [resource_type for (resource_type, _), limit in zip(requests, limits) if limit != -1]
+        )
         
-        # Check if requested amount would exceed limit
-        if current_usage + requested_amount > limit:
-            return False, f"Daily quota exceeded. Used {current_usage}/{limit} {resource_type}"
+        results = []
+        for (resource_type, requested_amount), limit in zip(requests, limits):
+            if limit == -1:
+                results.append((True, "Unlimited quota"))
+                continue
+            
+            current_usage = usage[resource_type]
+            
+            # Check if requested amount would exceed limit
+            if current_usage + requested_amount > limit:
+                results.append(
+                    (False, f"Daily quota exceeded. Used {current_usage}/{limit} {resource_type}")
+                )
+            else:
+                remaining = limit - current_usage
+                results.append((True, f"Quota available: {remaining}/{limit} {resource_type}"))
         
-        remaining = limit - current_usage
-        return True, f"Quota available: {remaining}/{limit} {resource_type}"
+        return results
     
     @staticmethod
     def get_usage_stats(
@@ -0,0 +1,27 @@
+"""
+Markdown code-fence handling for JSON returned by LLM providers
+"""
+import re
+
+# Opening fence with optional "json" tag and a closing fence that ends the
+# response; the payload may itself contain ``` inside JSON strings
+_FENCED = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*\Z", re.DOTALL | re.IGNORECASE)
+
+# Fallback: everything up to the first closing fence (or the end, if the
+# response was cut off before it), dropping any chatter after the fence
+_FENCE_OPEN = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*(?:```|\Z)", re.DOTALL | re.IGNORECASE)
+
+
+def strip_fence(text: str) -> str:
+    """
+    Return the JSON payload from an LLM response, without a surrounding
+    ```/```json code fence if there is one.
+    
+    Args:
+        text: Raw LLM response text
+        
+    Returns:
+        The fenced content, or the stripped text if it isn't fenced
+    """
+    match = _FENCED.match(text) or _FENCE_OPEN.match(text)
+    return match.group(1) if match else text.strip()
@@ -11,6 +11,13 @@ chat_messages_total = Counter(
     ['status']  # success, error, quota_exceeded
 )
 
+# Known label values are materialized at import so the first request after a
+# restart doesn't pay for creating the child
+_chat_messages_by_status = {
+    status: chat_messages_total.labels(status=status)
+    for status in ('success', 'error', 'quota_exceeded')
+}
+
 # Token usage metrics
 chat_tokens_total = Counter(
     'intelligence_chat_tokens_total',
@@ -18,6 +25,10 @@ chat_tokens_total = Counter(
     ['direction']  # input, output
 )
 
+# Pre-bound children so per-message increments skip the label lookup
+_chat_tokens_input = chat_tokens_total.labels(direction='input')
+_chat_tokens_output = chat_tokens_total.labels(direction='output')
+
 # LLM provider latency metrics
 llm_provider_latency_seconds = Histogram(
     'intelligence_llm_provider_latency_seconds',
@@ -53,6 +64,11 @@ memory_context_size = Gauge(
     ['tier']  # stm, itm, ltm
 )
 
+_memory_context_size_by_tier = {
+    tier: memory_context_size.labels(tier=tier)
+    for tier in ('stm', 'itm', 'ltm')
+}
+
 # Session metrics
 active_sessions = Gauge(
     'intelligence_active_sessions',
@@ -66,16 +82,24 @@ streaming_requests_total = Counter(
     ['status']
 )
 
+_streaming_requests_by_status = {
+    status: streaming_requests_total.labels(status=status)
+    for status in ('success', 'error')
+}
+
 
 def track_message_processing(status: str):
     """Track chat message processing."""
-    chat_messages_total.labels(status=status).inc()
+    child = _chat_messages_by_status.get(status)
+    if child is None:
+        child = chat_messages_total.labels(status=status)
+    child.inc()
 
 
 def track_tokens(input_tokens: int, output_tokens: int):
     """Track token usage."""
-    chat_tokens_total.labels(direction='input').inc(input_tokens)
-    chat_tokens_total.labels(direction='output').inc(output_tokens)
+    _chat_tokens_input.inc(input_tokens)
+    _chat_tokens_output.inc(output_tokens)
 
 
 def track_memory_context(memory_count: dict):
@@ -86,7 +110,10 @@ def track_memory_context(memory_count: dict):
         memory_count: Dict with keys 'stm', 'itm', 'ltm' and their counts
     """
     for tier, count in memory_count.items():
-        memory_context_size.labels(tier=tier).set(count)
+        child = _memory_context_size_by_tier.get(tier)
+        if child is None:
+            child = memory_context_size.labels(tier=tier)
+        child.set(count)
 
 
 def observe_provider_latency(provider: str, model: str, duration_seconds: float):
@@ -118,4 +145,7 @@ def decrement_active_sessions():
 
 def track_streaming_request(status: str):
     """Track streaming request."""
-    streaming_requests_total.labels(status=status).inc()
+    child = _streaming_requests_by_status.get(status)
+    if child is None:
+        child = streaming_requests_total.labels(status=status)
+    child.inc()
@@ -0,0 +1,20 @@
+"""
+JSON response class backed by pydantic-core's encoder
+"""
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse that encodes with pydantic-core (Rust) instead of stdlib
+    json.dumps, writing compact UTF-8 bytes in one pass.
+
+    FastAPI has already run the response_model serializer by the time the
+    content gets here, so it is plain JSON-compatible data.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
@@ -0,0 +1,101 @@
+"""Server-sent event framing and stream helpers shared by the streaming endpoints."""
+import asyncio
+import json
+from typing import AsyncIterator
+
+# Per-token SSE frame. Only the chunk text needs JSON escaping; the output
+# matches json.dumps({"content": chunk, "done": False}) byte for byte.
+# Frames are yielded as bytes so StreamingResponse passes them through
+# without its own per-chunk encode.
+_encode_json_string = json.encoder.encode_basestring_ascii
+
+SSE_ERROR_FRAME = (
+    "data: "
+    + json.dumps({"error": "An error occurred while processing your request", "done": True})
+    + "\n\n"
+).encode("ascii")
+
+# Sent when no provider could serve the stream; the response has already
+# started, so this can't be a 503
+SSE_UNAVAILABLE_FRAME = (
+    "data: "
+    + json.dumps({"error": "LLM providers unavailable", "done": True})
+    + "\n\n"
+).encode("ascii")
+
+
+def sse_content_frame(chunk: str) -> bytes:
+    # The escaped string is pure ASCII, so this encode never falls back
+    return b'data: {"content": ' + _encode_json_string(chunk).encode("ascii") + b', "done": false}\n\n'
+
+
+def sse_frame(payload: dict) -> bytes:
+    return b"data: " + json.dumps(payload).encode("ascii") + b"\n\n"
+
+
+_STREAM_END = object()
+
+
+async def prefetch_stream(
+    stream: AsyncIterator[str],
+    maxsize: int = 64,
+    min_chars: int = 16,
+    max_delay: float = 0.01,
+) -> AsyncIterator[str]:
+    """
+    Read `stream` in a background task, buffering up to `maxsize` chunks.
+
+    A slow client then doesn't stall generation; provider errors are
+    re-raised to the consumer. Chunks shorter than `min_chars` are merged
+    for at most `max_delay` seconds so each SSE frame carries more text.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def produce() -> None:
+        try:
+            async for chunk in stream:
+                if chunk:
+                    await queue.put(chunk)
+        except Exception as exc:  # handed to the consumer
+            await queue.put(exc)
+        else:
+            await queue.put(_STREAM_END)
+
+    loop = asyncio.get_running_loop()
+    producer = asyncio.create_task(produce())
+    pending = None
+    try:
+        while pending is None:
+            item = await queue.get()
+            if item is _STREAM_END:
+                return
+            if isinstance(item, Exception):
+                raise item
+
+            parts = [item]
+            size = len(item)
+            deadline = loop.time() + max_delay
+            while size < min_chars:
+                if not queue.empty():
+                    item = queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STREAM_END or isinstance(item, Exception):
+                    # Flush what we have before ending or raising
+                    pending = item
+                    break
+                parts.append(item)
+                size += len(item)
+
+            yield parts[0] if len(parts) == 1 else "".join(parts)
+
+        if isinstance(pending, Exception):
+            raise pending
+    finally:
+        producer.cancel()
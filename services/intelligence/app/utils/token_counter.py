@@ -1,5 +1,7 @@
 """Token counting utilities."""
+import hashlib
 import logging
+from collections import OrderedDict
 
 logger = logging.getLogger(__name__)
 
@@ -7,7 +9,7 @@ logger = logging.getLogger(__name__)
 class TokenCounter:
     """Token counter using tiktoken with lazy initialization."""
     
-    def __init__(self, model: str = "gpt-3.5-turbo"):
+    def __init__(self, model: str = "gpt-3.5-turbo", cache_size: int = 4096):
         """Initialize token counter.
         
         Note: We use GPT-3.5 encoding as a reasonable approximation for Mistral.
@@ -16,6 +18,10 @@ class TokenCounter:
         self.model = model
         self._encoding = None
         self._use_fallback = False
+        # LRU of text digest -> token count; keyed by digest so cached
+        # prompts aren't kept alive in memory
+        self._count_cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._count_cache_size = cache_size
     
     def _get_encoding(self):
         """Lazy load encoding on first use."""
@@ -41,7 +47,7 @@ class TokenCounter:
         try:
             encoding = self._get_encoding()
             if encoding:
-                return len(encoding.encode(text))
+                return self._count_cached(encoding, text)
             else:
                 return max(len(text) // 4, 1)
         except Exception as e:
@@ -49,6 +55,20 @@ class TokenCounter:
             # Rough estimate: ~4 chars per token
             return max(len(text) // 4, 1)
     
+    def _count_cached(self, encoding, text: str) -> int:
+        """Encode text, reusing the count for recently seen identical text."""
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        count = self._count_cache.get(key)
+        if count is not None:
+            self._count_cache.move_to_end(key)
+            return count
+
+        count = len(encoding.encode(text))
+        self._count_cache[key] = count
+        if len(self._count_cache) > self._count_cache_size:
+            self._count_cache.popitem(last=False)
+        return count
+    
     def count_conversation_tokens(self, messages: list) -> int:
         """Count tokens in a conversation.
         
@@ -8,11 +8,12 @@ from contextlib import asynccontextmanager
 from prometheus_fastapi_instrumentator import Instrumentator
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from app.config import settings
+from app.config import get_settings
 from app.database import test_connection
 from app.services.llm_router import llm_orchestrator
+from app.services.integration_service import integration_service
 from app.routers import chat, quiz, educator
-from app.models.schemas import HealthResponse, LLMProviderStatus
+from app.models.schemas import HealthResponse, build_provider_status
 from app.middleware import CorrelationIdMiddleware
 
 # Configure structured logging with structlog
@@ -27,6 +28,7 @@ structlog.configure(
     logger_factory=structlog.PrintLoggerFactory(),
 )
 logger = structlog.get_logger("intelligence-service")
+settings = get_settings()
 
 
 @asynccontextmanager
@@ -47,6 +49,7 @@ async def lifespan(app: FastAPI):
         providers=llm_orchestrator.list_provider_names(),
         any_ready=is_ready,
     )
+    llm_orchestrator.start_readiness_probe()
     
     logger.info("🚀 Intelligence Core ready", port=settings.port)
     
@@ -54,6 +57,9 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Intelligence Core shutting down")
+    await llm_orchestrator.stop_readiness_probe()
+    await llm_orchestrator.shutdown()
+    await integration_service.close()
 
 
 # Create FastAPI app
@@ -107,7 +113,7 @@ async def health():
     """Health check endpoint."""
     db_healthy = test_connection()
     provider_statuses = await llm_orchestrator.get_provider_status()
-    provider_payload = [LLMProviderStatus(**status.__dict__) for status in provider_statuses]
+    provider_payload = tuple(build_provider_status(status) for status in provider_statuses)
     ollama_status = next((status for status in provider_statuses if status.name == "ollama"), None)
     ollama_healthy = bool(ollama_status and ollama_status.enabled and ollama_status.healthy)
     model_loaded = any(status.enabled and status.healthy for status in provider_statuses)
@@ -116,7 +122,8 @@ async def health():
     ollama_provider = llm_orchestrator.get_provider("ollama")
     gpu_available = getattr(ollama_provider, "gpu_available", False) if ollama_provider else False
     
-    return HealthResponse(
+    # Every field is already typed/validated; skip re-validating the providers
+    return HealthResponse.model_construct(
         status="healthy" if db_healthy and ollama_healthy else "degraded",
         service="intelligence-core",
         database=db_healthy,
@@ -0,0 +1,85 @@
+"""
+Unit tests for settings coercion
+"""
+import pytest
+from app.config import Settings, _coerce_priority, _coerce_timeouts
+
+
+class TestCoercePriority:
+    """Test suite for _coerce_priority"""
+
+    @pytest.mark.parametrize("value, expected", [
+        (None, ["ollama"]),
+        ("", ["ollama"]),
+        ("Gemini, ollama", ["gemini", "ollama"]),
+        ('["openai", "ollama"]', ["openai", "ollama"]),
+        ('("gemini", "ollama")', ["gemini", "ollama"]),
+        ("[ollama, gemini]", ["ollama", "gemini"]),
+        ('{"openai": 1, "ollama": 2}', ["openai", "ollama"]),
+        (["OpenAI", " "], ["openai"]),
+    ])
+    def test_coerce_priority(self, value, expected):
+        """Test every supported priority shape"""
+        assert _coerce_priority(value) == expected
+
+    def test_cached_result_is_not_shared(self):
+        """Test callers get a fresh list for repeated string input"""
+        first = _coerce_priority("gemini,ollama")
+        first.append("openai")
+
+        assert _coerce_priority("gemini,ollama") == ["gemini", "ollama"]
+
+
+class TestCoerceTimeouts:
+    """Test suite for _coerce_timeouts"""
+
+    def test_comma_pairs(self):
+        """Test provider:seconds pairs"""
+        assert _coerce_timeouts("Gemini: 5, ollama:30") == {"gemini": 5.0, "ollama": 30.0}
+
+    def test_json_object(self):
+        """Test JSON object input"""
+        assert _coerce_timeouts('{"openai": 12}') == {"openai": 12.0}
+
+    def test_invalid_entries_are_skipped(self):
+        """Test malformed entries are ignored"""
+        assert _coerce_timeouts("gemini, ollama:abc, openai:7") == {"openai": 7.0}
+
+    @pytest.mark.parametrize("value", ["a:1:2", "a:1 b:2"])
+    def test_unseparated_pairs_are_skipped(self, value):
+        """Test pairs only match at the start of an entry"""
+        assert _coerce_timeouts(value) == {}
+
+    def test_trailing_decimal_point(self):
+        """Test seconds written with a trailing decimal point"""
+        assert _coerce_timeouts("ollama:5.") == {"ollama": 5.0}
+
+    def test_cached_result_is_not_shared(self):
+        """Test callers get a fresh dict for repeated string input"""
+        _coerce_timeouts("gemini:5")["gemini"] = 99.0
+
+        assert _coerce_timeouts("gemini:5") == {"gemini": 5.0}
+
+
+class TestSettingsValidators:
+    """Test suite for Settings field validators"""
+
+    def test_provider_settings_from_env(self, monkeypatch):
+        """Test provider priority and timeouts are coerced on construction"""
+        monkeypatch.setenv("LLM_PROVIDER_PRIORITY", "gemini,ollama")
+        monkeypatch.setenv("LLM_PROVIDER_TIMEOUTS", "gemini:5")
+
+        settings = Settings()
+
+        assert settings.llm_provider_priority == ["gemini", "ollama"]
+        assert settings.llm_provider_timeouts == {"gemini": 5.0}
+
+    def test_provider_settings_defaults(self, monkeypatch):
+        """Test unset provider settings fall back to defaults"""
+        monkeypatch.delenv("LLM_PROVIDER_PRIORITY", raising=False)
+        monkeypatch.delenv("LLM_PROVIDER_TIMEOUTS", raising=False)
+
+        settings = Settings()
+
+        assert settings.llm_provider_priority == ["ollama"]
+        assert settings.llm_provider_timeouts == {}
@@ -0,0 +1,27 @@
+"""
+Unit tests for code-fence stripping
+"""
+import pytest
+from app.utils.jsonfence import strip_fence
+
+
+class TestStripFence:
+    """Test suite for strip_fence function"""
+
+    @pytest.mark.parametrize("text, expected", [
+        ('{"a": 1}', '{"a": 1}'),
+        ('  {"a": 1}\n', '{"a": 1}'),
+        ('```json\n{"a": 1}\n```', '{"a": 1}'),
+        ('```JSON {"a": 1}```', '{"a": 1}'),
+        ('```\n{"a": 1}\n```\nHope this helps!', '{"a": 1}'),
+        ('\n```json\n{"a": 1}', '{"a": 1}'),
+    ])
+    def test_strip_fence(self, text, expected):
+        """Test fenced, unfenced and unterminated responses"""
+        assert strip_fence(text) == expected
+
+    def test_fence_inside_payload(self):
+        """Test a ``` inside a JSON string doesn't end the fenced block"""
+        text = '```json\n{"q": "Which fence starts a block: ```python?"}\n```'
+
+        assert strip_fence(text) == '{"q": "Which fence starts a block: ```python?"}'
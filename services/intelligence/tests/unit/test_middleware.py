@@ -0,0 +1,78 @@
+"""
+Unit tests for the correlation ID middleware
+"""
+from starlette.datastructures import State
+
+from app.middleware import CorrelationIdMiddleware
+
+
+def make_scope(path, headers=()):
+    return {"type": "http", "path": path, "headers": list(headers)}
+
+
+async def run_middleware(scope, read_state=False):
+    """Run the middleware around a minimal app; return (state, sent messages)"""
+    seen = {}
+
+    async def app(scope, receive, send):
+        state = State(scope["state"])
+        if read_state:
+            seen["correlation_id"] = state.correlation_id
+        seen["state"] = state
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request"}
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await CorrelationIdMiddleware(app, uuid_pool_size=4)(scope, receive, send)
+    return seen, messages
+
+
+def response_header(messages, name):
+    for key, value in messages[0]["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class TestCorrelationIdMiddleware:
+    """Test suite for CorrelationIdMiddleware"""
+
+    async def test_header_value_is_reused(self):
+        """Test an incoming ID is exposed as a str and echoed back"""
+        scope = make_scope("/chat/message", [(b"x-correlation-id", b"abc-123")])
+
+        seen, messages = await run_middleware(scope, read_state=True)
+
+        assert seen["correlation_id"] == "abc-123"
+        assert type(seen["correlation_id"]) is str
+        assert response_header(messages, b"x-correlation-id") == "abc-123"
+
+    async def test_generated_id_is_a_str(self):
+        """Test a generated ID read from state matches the response header"""
+        seen, messages = await run_middleware(make_scope("/chat/message"), read_state=True)
+
+        assert type(seen["correlation_id"]) is str
+        assert len(seen["correlation_id"]) == 36
+        assert response_header(messages, b"x-correlation-id") == seen["correlation_id"]
+
+    async def test_skip_path_without_read_gets_no_id(self):
+        """Test /metrics responses don't get an ID nobody asked for"""
+        _, messages = await run_middleware(make_scope("/metrics"))
+
+        assert response_header(messages, b"x-correlation-id") is None
+
+    async def test_skip_path_with_header_echoes_it(self):
+        """Test probe requests that send an ID still get it back"""
+        scope = make_scope("/health", [(b"x-correlation-id", b"probe-1")])
+
+        seen, messages = await run_middleware(scope, read_state=True)
+
+        assert seen["correlation_id"] == "probe-1"
+        assert response_header(messages, b"x-correlation-id") == "probe-1"
@@ -0,0 +1,43 @@
+"""
+Unit tests for assessment check schemas
+"""
+import pytest
+from pydantic import ValidationError
+
+from app.models.schemas import Assessment, ShortAnswerCheck
+
+
+def make_check(check_type, answer):
+    return {
+        "type": check_type,
+        "question": "What is 6*7?",
+        "answer": answer,
+        "explanation": "Six sevens are forty-two.",
+    }
+
+
+class TestAssessmentChecks:
+    """Test suite for the discriminated assessment checks"""
+
+    @pytest.mark.parametrize("answer", [42, 4.2, "forty-two"])
+    def test_short_answer_accepts_scalars(self, answer):
+        """Test short-answer checks accept numeric and text answers"""
+        assessment = Assessment.model_validate({"checks": [make_check("short_answer", answer)]})
+
+        check = assessment.checks[0]
+        assert isinstance(check, ShortAnswerCheck)
+        assert check.answer == answer
+
+    def test_short_answer_from_json(self):
+        """Test a numeric short answer parses from model JSON output"""
+        assessment = Assessment.model_validate_json(
+            '{"checks": [{"type": "short_answer", "question": "6*7?",'
+            ' "answer": 42, "explanation": "Multiply."}]}'
+        )
+
+        assert assessment.checks[0].answer == 42
+
+    def test_true_false_rejects_text(self):
+        """Test true/false checks still require a boolean answer"""
+        with pytest.raises(ValidationError):
+            Assessment.model_validate({"checks": [make_check("true_false", "maybe")]})
@@ -0,0 +1,46 @@
+"""
+Unit tests for token counting utilities
+"""
+from app.utils.token_counter import TokenCounter
+
+
+class FakeEncoding:
+    """Whitespace 'tokenizer' that records how often it was called"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        return text.split()
+
+
+class TestTokenCounterCache:
+    """Test suite for the token count cache"""
+
+    def make_counter(self, cache_size=4096):
+        counter = TokenCounter(cache_size=cache_size)
+        counter._encoding = FakeEncoding()
+        return counter
+
+    def test_repeated_text_is_encoded_once(self):
+        """Test identical text reuses the cached count"""
+        counter = self.make_counter()
+
+        assert counter.count_tokens("one two three") == 3
+        assert counter.count_tokens("one two three") == 3
+        assert counter._encoding.calls == 1
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test the cache stays within its size"""
+        counter = self.make_counter(cache_size=2)
+
+        counter.count_tokens("a")
+        counter.count_tokens("b")
+        counter.count_tokens("a")
+        counter.count_tokens("c")  # evicts "b"
+        counter.count_tokens("a")
+        counter.count_tokens("b")
+
+        assert counter._encoding.calls == 4
+        assert len(counter._count_cache) == 2
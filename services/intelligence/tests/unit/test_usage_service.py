@@ -26,6 +26,23 @@ class TestUsageService:
         
         assert result is True
     
+    def test_record_usage_batch(self, db_session: Session):
+        """Test several ledger rows are recorded together"""
+        user_id = uuid4()
+        
+        result = UsageService.record_usage_batch(
+            db=db_session,
+            user_id=user_id,
+            entries=[
+                {"resource_type": "llm_tokens", "amount": 120, "metadata": {"model": "llama2"}},
+                {"resource_type": "messages", "amount": 1},
+            ]
+        )
+        
+        assert result is True
+        assert UsageService.get_today_usage(db_session, user_id, "llm_tokens") == 120
+        assert UsageService.get_today_usage(db_session, user_id, "messages") == 1
+    
     def test_get_today_usage_no_usage(self, db_session: Session):
         """Test getting usage when no usage exists"""
         user_id = uuid4()
@@ -134,6 +151,44 @@ class TestUsageService:
         assert has_quota is True
         assert "unlimited" in message.lower()
     
+    def test_check_quotas_evaluates_each_request(self, db_session: Session):
+        """Test batched quota check returns one result per resource"""
+        user_id = uuid4()
+        
+        UsageService.record_usage(
+            db=db_session,
+            user_id=user_id,
+            resource_type="llm_tokens",
+            amount=900
+        )
+        UsageService.record_usage(
+            db=db_session,
+            user_id=user_id,
+            resource_type="messages",
+            amount=3
+        )
+        
+        results = UsageService.check_quotas(
+            db=db_session,
+            user_id=user_id,
+            tier="free_trial",
+            requests=[("llm_tokens", 200), ("messages", 1)]
+        )
+        
+        assert results[0] == (False, "Daily quota exceeded. Used 900/1000 llm_tokens")
+        assert results[1] == (True, "Quota available: 97/100 messages")
+    
+    def test_check_quotas_pro_unlimited(self, db_session: Session):
+        """Test batched quota check for pro tier (unlimited)"""
+        results = UsageService.check_quotas(
+            db=db_session,
+            user_id=uuid4(),
+            tier="pro",
+            requests=[("llm_tokens", 50000), ("messages", 1)]
+        )
+        
+        assert results == [(True, "Unlimited quota"), (True, "Unlimited quota")]
+    
     def test_get_usage_stats_empty(self, db_session: Session):
         """Test getting usage stats with no data"""
         user_id = uuid4()
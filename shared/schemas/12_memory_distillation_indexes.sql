@@ -0,0 +1,22 @@
+-- Memory Distillation Performance Indexes
+-- These indexes support the nightly distillation-worker queries so they scan
+-- only the rows they touch instead of the whole memories table.
+--
+-- CONCURRENTLY avoids blocking writes on a live database. It cannot run inside
+-- a transaction block, so apply this file with plain psql (no --single-transaction).
+-- Run ANALYZE memories afterwards so the planner picks the new indexes up.
+
+-- Index for the recent-reflections window
+-- Optimizes: SELECT ... FROM memories WHERE type = 'reflection' AND created_at >= ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_memories_reflection_recent
+  ON memories(created_at DESC)
+  WHERE type = 'reflection';
+
+-- Index for ITM -> LTM promotion
+-- Optimizes: UPDATE memories SET tier = 'ltm'
+--           WHERE tier = 'itm' AND constitution_valid = true AND access_count >= ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_memories_itm_promote
+  ON memories(access_count)
+  WHERE tier = 'itm' AND constitution_valid = true;
+
+ANALYZE memories;
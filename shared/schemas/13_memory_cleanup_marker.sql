@@ -0,0 +1,19 @@
+-- Add expiry cleanup marker to memories table
+-- Lets the distillation worker process each expired memory exactly once
+-- instead of rewriting every already-expired row on each nightly run
+
+ALTER TABLE memories
+ADD COLUMN IF NOT EXISTS cleanup_at TIMESTAMP;
+
+-- Index for expiry cleanup, covering only rows still waiting for cleanup
+-- Optimizes: UPDATE memories SET cleanup_at = NOW(), expires_at = NOW()
+--           WHERE expires_at < NOW() AND tier != 'ltm' AND cleanup_at IS NULL
+--
+-- CONCURRENTLY avoids blocking writes on a live database. It cannot run inside
+-- a transaction block, so apply this file with plain psql (no --single-transaction).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_memories_expiring
+  ON memories(expires_at)
+  WHERE expires_at IS NOT NULL AND tier != 'ltm' AND cleanup_at IS NULL;
+
+-- Add comment for documentation
+COMMENT ON COLUMN memories.cleanup_at IS 'When the distillation worker processed this memory''s expiry; NULL until then';
@@ -0,0 +1,14 @@
+-- Prompt History Performance Index
+-- The chat fallback context reads the latest few prompts of a session on
+-- most turns; this lets it read them straight off the index.
+--
+-- CONCURRENTLY avoids blocking writes on a live database. It cannot run inside
+-- a transaction block, so apply this file with plain psql (no --single-transaction).
+
+-- Index for the latest prompts of a session
+-- Optimizes: SELECT ... FROM prompts WHERE session_id = ?
+--           ORDER BY created_at DESC LIMIT ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_prompts_session_created
+  ON prompts(session_id, created_at DESC);
+
+ANALYZE prompts;